@@ -0,0 +1,64 @@
+import json
+
+import numpy as np
+
+from typing import Dict, Tuple
+
+
+class DeadbandFilter:
+    """
+        Change detection of forwarded points. A value passes when it differs from the last passed value of its point
+        by more than the point's deadband: the larger of the absolute deadband and the percentage of the last
+        passed value. The first value of a point always passes. With the default zero deadbands only the
+        unchanged values are held back.
+
+        Counts the passed (forwarded) and held back (suppressed) values of every point.
+    """
+
+    def __init__(self, num_points: int, absolute=0.0, percentage=0.0):
+        """
+        :param absolute: deadband in the units of the values, one for all points or one per point
+        :param percentage: deadband in % of the last passed value, one for all points or one per point
+        """
+        self._absolute = np.array(np.broadcast_to(absolute, num_points), dtype=np.float64)
+        self._fraction = np.array(np.broadcast_to(percentage, num_points), dtype=np.float64) / 100
+        self._last_passed = np.full(num_points, np.nan)
+        self.num_forwarded = np.zeros(num_points, dtype=np.int64)
+        self.num_suppressed = np.zeros(num_points, dtype=np.int64)
+
+    @classmethod
+    def from_file(cls, path: str, num_points: int, absolute=0.0, percentage=0.0) -> "DeadbandFilter":
+        """
+            Per point deadbands from a JSON file {"<index>": {"absolute": ..., "percentage": ...}},
+            the points (and keys) missing in the file keep the given defaults.
+        """
+        with open(path) as file:
+            config: Dict[str, dict] = json.load(file)
+        absolutes = np.full(num_points, absolute, dtype=np.float64)
+        percentages = np.full(num_points, percentage, dtype=np.float64)
+        for index, deadbands in config.items():
+            absolutes[int(index)] = deadbands.get("absolute", absolute)
+            percentages[int(index)] = deadbands.get("percentage", percentage)
+        return cls(num_points, absolutes, percentages)
+
+    def filter(self, indexes: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """Returns the mask of the values to forward, they become the last passed values of their points"""
+        last_passed = self._last_passed[indexes]
+        deadbands = np.maximum(self._absolute[indexes], self._fraction[indexes] * np.abs(last_passed))
+        # NaN (nothing passed yet) compares as False, so the first values pass
+        passed = ~(np.abs(values - last_passed) <= deadbands)
+        self._last_passed[indexes[passed]] = values[passed]
+        np.add.at(self.num_forwarded, indexes[passed], 1)
+        np.add.at(self.num_suppressed, indexes[~passed], 1)
+        return passed
+
+    def counts(self) -> Tuple[int, int]:
+        """Total (forwarded, suppressed) values"""
+        return int(self.num_forwarded.sum()), int(self.num_suppressed.sum())
+
+    def summary(self) -> str:
+        num_forwarded, num_suppressed = self.counts()
+        total = num_forwarded + num_suppressed
+        share = 100 * num_suppressed / total if total else 0.0
+        return f"{num_forwarded} values forwarded, {num_suppressed} suppressed ({share:.1f}%), " \
+               f"suppressed per point: {self.num_suppressed.tolist()}"
@@ -6,6 +6,8 @@ from pydnp3.opendnp3 import GroupVariation
 from cosim.dnp3.soe_handler import SOEHandlerAdjusted
 from cosim.dnp3.lfc.LFC_master import MasterStation
 
+MASTER2_SCAN_TIME = 60000 # ms, the fast scan of an unconfigured MyMaster
+
 
 class DLAASOEHandler(SOEHandlerAdjusted):
     def __init__(self, log_file_path="logs/soehandler.log", soehandler_log_level=logging.INFO, station_ref=None, station_ref2=None, coeffs=[0]*18, *args, **kwargs):
@@ -20,15 +22,18 @@ class DLAASOEHandler(SOEHandlerAdjusted):
             freq3 = visitor_index_and_value[2][1] / 1000
             freq_pu = (freq3 - self._NOMINAL_FREQ) / self._NOMINAL_FREQ
             self.logger.info(f"Freq: {freq3} Hz")
+            attacks, attacks2 = {}, {}
             for i, coeff in enumerate(self._coeffs):
                 if coeff == 0:
                     continue
                 attack_load = 1 + freq_pu * -coeff
                 self.logger.info(f"DLAA: {attack_load} p.u., coeff {coeff}")
                 if i < 10:
-                    self.station_ref.send_direct_point_command(40, 4, i, attack_load)
+                    attacks[i] = attack_load
                 else:
-                    self._station_ref2.send_direct_point_command(40, 4, i, attack_load)
+                    attacks2[i] = attack_load
+            self.station_ref.send_direct_point_commands(40, 4, attacks)
+            self._station_ref2.send_direct_point_commands(40, 4, attacks2)
                 
 
 def main():
@@ -47,6 +52,9 @@ def main():
     master2 = MasterStation(outstation_ip=outstation_ip2, port=port2, master_id=1, outstation_id=2, log_handler=None)
     soe_handler = DLAASOEHandler(logs_file, station_ref=master, station_ref2=master2, coeffs=coeffs)
     master.configure_master(soe_handler, outstation_ip, port, scan_time=step_time)
+    # Only sends the commands, its channel moves to the shared manager as well
+    master2.configure_master(SOEHandlerAdjusted(logs_file, station_ref=master2), outstation_ip2, port2,
+                             scan_time=MASTER2_SCAN_TIME)
     master.start()
     master2.start()
     
@@ -1,18 +1,48 @@
+import argparse
+import itertools
+import json
 import logging
 import threading
 import time
 
+import numpy as np
+
 from pydnp3 import opendnp3, asiodnp3, openpal, asiopal
 from pydnp3.opendnp3 import GroupVariation
 from dnp3_python.dnp3station.visitors import *
 
+from cosim import latency
+from cosim.dnp3.deadband import DeadbandFilter
 from cosim.dnp3.soe_handler import SOEHandlerAdjusted
-from cosim.dnp3.master import MasterStation
+from cosim.dnp3.manager_pool import get_shared_manager, set_num_threads
+from cosim.dnp3.master import MasterStation, UNSOLICITED_INTEGRITY_PERIOD
 from cosim.mylogging import getLogger
+from cosim.watchdog import Watchdog
 
 _log = getLogger(__name__, "logs/d_r_lfc_forwarder.log")
 
 SCALING_TO_INT = 1000000
+MAX_DISCONNECTION_TIME = 5 # sec
+DEADBAND_REPORT_INTERVAL = 100 # responses
+# Static values of the polls and the (floating point) events of the unsolicited responses, an outstation configures
+# the event variation independently of the static one
+UPSTREAM_ANALOG_GVS = [GroupVariation.Group30Var6, GroupVariation.Group32Var5, GroupVariation.Group32Var6,
+                       GroupVariation.Group32Var7, GroupVariation.Group32Var8]
+
+# Points of the upstream (external) outstations merged into the local outstation. "analogs" lists the local index
+# of every upstream analog, in the upstream order, "analog_outputs" the local AO index of every upstream AO.
+# Both can also be {"<upstream index>": local index} dictionaries. concurrency_hint, the threads of the shared manager,
+# defaults to one per upstream plus one for the local outstation.
+# An upstream with "unsolicited": true reports its events unsolicited and is only polled every integrity period.
+DEFAULT_POINT_MAP = {
+    "local": {"ip": "0.0.0.0", "port": 20003, "outstation_id": 4, "master_id": 3,
+              "initial_analogs": [377, 377, 377, 377, 377, 377, 377, 377, 377, 377,
+                                  -4.77014, 229.987, 93.0968, 124.107, 4.79325, -229.561, -92.8474, -123.898]},
+    "upstreams": [
+        {"name": "rtds", "ip": "172.24.14.211", "port": 20000, "outstation_id": 2, "master_id": 1,
+         "analogs": list(range(18)), "analog_outputs": list(range(4))}
+    ]
+}
 
 class MyLogger(openpal.ILogHandler):
     def __init__(self):
@@ -26,30 +56,74 @@ class MyLogger(openpal.ILogHandler):
 
 
 class ForwarderSOEHandler(SOEHandlerAdjusted):
-    def __init__(self, log_file_path="logs/soehandler.log", soehandler_log_level=logging.INFO, station_ref=None, outstation_app=None, *args, **kwargs):
+    def __init__(self, log_file_path="logs/soehandler.log", soehandler_log_level=logging.INFO, station_ref=None, outstation_app=None,
+                 deadband_filter: DeadbandFilter = None, index_map: dict = None, name="external outstation", *args, **kwargs):
         super().__init__(log_file_path, soehandler_log_level, station_ref, *args, **kwargs)
         self.outstation_app: OutstationApplication = outstation_app
+        # upstream analog index -> local analog index, the unmapped points are not forwarded; same indexes by default
+        self.index_map = index_map
+        self.name = name
+        # Without a filter every forwarded value generates an event
+        self.deadband_filter = deadband_filter
+        self._num_responses = 0
+        # Values of one response, index -> value, forwarded together in End()
+        self._pending_values = {}
+        self._watchdog_entry = Watchdog.get().register(f"{self.__class__.__name__} {name}", MAX_DISCONNECTION_TIME,
+                                                       self._warn_when_no_connection)
     
     def _process_incoming_data(self, info_gv, visitor_index_and_value):
-        _log.debug(f'Processing incoming data for info_gv={info_gv}, visitor_index_and_value={visitor_index_and_value}')
-        if info_gv in [GroupVariation.Group30Var6]:
-            for index, value in visitor_index_and_value:
-                analog_value = opendnp3.Analog(value*SCALING_TO_INT)
-                self.outstation_app.apply_update(analog_value, index)
-                _log.debug(f'Data forwarded to local outstation: index={index}, value={value}')
+        if _log.isEnabledFor(logging.DEBUG):
+            _log.debug(f'Processing incoming data for info_gv={info_gv}, visitor_index_and_value={visitor_index_and_value}')
+        if info_gv in UPSTREAM_ANALOG_GVS:
+            self._watchdog_entry.feed()
+            # The latest value of a point wins when it comes in several headers of the response
+            self._pending_values.update(visitor_index_and_value)
+
+    def Start(self):
+        super().Start()
+        self._pending_values = {}
+
+    def End(self):
+        super().End()
+        if self.index_map is not None:
+            self._pending_values = {self.index_map[index]: value for index, value in self._pending_values.items()
+                                    if index in self.index_map}
+        if not self._pending_values:
+            return
+        events = None
+        if self.deadband_filter is not None:
+            indexes = np.fromiter(self._pending_values.keys(), dtype=np.int64, count=len(self._pending_values))
+            values = np.fromiter(self._pending_values.values(), dtype=np.float64, count=len(self._pending_values))
+            events = self.deadband_filter.filter(indexes, values).tolist()
+        self.outstation_app.apply_updates([(opendnp3.Analog(value*SCALING_TO_INT), index)
+                                           for index, value in self._pending_values.items()], events)
+        latency.stamp(latency.HOP_COMPUTED)
+        if _log.isEnabledFor(logging.DEBUG):
+            _log.debug(f'Data of {self.name} forwarded to local outstation: {self._pending_values}')
+        self._pending_values = {}
+
+        self._num_responses += 1
+        if self.deadband_filter is not None and self._num_responses % DEADBAND_REPORT_INTERVAL == 0:
+            _log.info(f'Deadband filter of {self.name}: {self.deadband_filter.summary()}')
+
+    
+    def _warn_when_no_connection(self):
+        _log.warning(f"No data from the {self.name} for {MAX_DISCONNECTION_TIME} sec.")
 
 
 class OutstationApplication(opendnp3.IOutstationApplication):
     outstation = None
     
-    def __init__(self, local_ip, port, local_addr, remote_addr, cmd_handler, initial_analogs):
+    def __init__(self, local_ip, port, local_addr, remote_addr, cmd_handler, initial_analogs, shadow_db=True,
+                 num_analogs=18, num_ao_statuses=4, unsolicited=False, event_buffer_size=None, manager=None):
         super(OutstationApplication, self).__init__()
-        self.stack_config = self.configure_stack(local_addr, remote_addr)
+        self.stack_config = self.configure_stack(local_addr, remote_addr, num_analogs, num_ao_statuses, unsolicited,
+                                                 event_buffer_size)
         self.configure_database(self.stack_config.dbConfig)
         
-        threads_to_allocate = 1
+        # The process-wide shared manager by default
         self.log_handler = MyLogger()
-        self.manager = asiodnp3.DNP3Manager(threads_to_allocate, self.log_handler)
+        self.manager = manager if manager is not None else get_shared_manager(self.log_handler)
         
         self.retry_parameters = asiopal.ChannelRetry().Default()
         self.listener = AppChannelListener()
@@ -66,7 +140,8 @@ class OutstationApplication(opendnp3.IOutstationApplication):
                                                     self,
                                                     self.stack_config)
         
-        self.db_handler = DBHandler(stack_config=self.stack_config)
+        # Python-side copy of the forwarded values, nothing in the forwarder reads it
+        self.db_handler = DBHandler(stack_config=self.stack_config) if shadow_db else None
 
         if initial_analogs:
             self._load_initial_analog_values(initial_analogs)
@@ -75,14 +150,21 @@ class OutstationApplication(opendnp3.IOutstationApplication):
     
     
     @staticmethod
-    def configure_stack(local_addr, remote_addr):
-        db_event_buffer_size = 22
+    def configure_stack(local_addr, remote_addr, num_analogs=18, num_ao_statuses=4, unsolicited=False,
+                        event_buffer_size=None):
+        """
+        :param unsolicited: push the events to the master as soon as they are recorded, once the master enables it
+        :param event_buffer_size: events of each type kept until read, one per point by default
+        """
+        db_event_buffer_size = event_buffer_size or num_analogs + num_ao_statuses
         sizes = opendnp3.DatabaseSizes()
-        sizes.numAnalog = 18
-        sizes.numAnalogOutputStatus = 4
+        sizes.numAnalog = num_analogs
+        sizes.numAnalogOutputStatus = num_ao_statuses
         stack_config = asiodnp3.OutstationStackConfig(sizes)
         stack_config.outstation.eventBufferConfig = opendnp3.EventBufferConfig().AllTypes(db_event_buffer_size)
-        stack_config.outstation.params.allowUnsolicited = False
+        stack_config.outstation.params.allowUnsolicited = unsolicited
+        if unsolicited:
+            stack_config.outstation.params.unsolClassMask = opendnp3.ClassField.AllEventClasses()
         stack_config.link.LocalAddr = local_addr
         stack_config.link.RemoteAddr = remote_addr
         stack_config.link.KeepAliveTimeout = openpal.TimeDuration().Max()
@@ -91,14 +173,14 @@ class OutstationApplication(opendnp3.IOutstationApplication):
     @staticmethod
     def configure_database(db_config):
         # Configure analog points for incoming data (Group30Var6)
-        for i in range(18):
+        for i in range(db_config.sizes.numAnalog):
             db_config.analog[i].clazz = opendnp3.PointClass.Class2
             db_config.analog[i].svariation = opendnp3.StaticAnalogVariation.Group30Var6
             db_config.analog[i].evariation = opendnp3.EventAnalogVariation.Group32Var6
             db_config.analog[i].deadband = 0
         
         # Configure analog output points for outgoing commands (Group40Var4)
-        for i in range(4): 
+        for i in range(db_config.sizes.numAnalogOutputStatus):
             db_config.aoStatus[i].clazz = opendnp3.PointClass.Class2
             db_config.aoStatus[i].svariation = opendnp3.StaticAnalogOutputStatusVariation.Group40Var4
             db_config.aoStatus[i].evariation = opendnp3.EventAnalogOutputStatusVariation.Group42Var4
@@ -110,7 +192,8 @@ class OutstationApplication(opendnp3.IOutstationApplication):
     
     def shutdown(self):
         _log.info('Outstation exiting.')
-        self.manager.Shutdown()
+        # Only the outstation's channel, the manager may be shared
+        self.channel.Shutdown()
     
     @classmethod
     def get_outstation(cls):
@@ -129,16 +212,28 @@ class OutstationApplication(opendnp3.IOutstationApplication):
 
     
     def apply_update(self, value, index):
-        _log.debug(f'Recording {type(value).__name__} measurement, index={index}, value={value.value}')
+        self.apply_updates([(value, index)])
+
+    def apply_updates(self, values_and_indexes, events=None):
+        """
+            Records all the (measurement, index) pairs with one UpdateBuilder and a single Apply.
+            The static values are always updated, events[i] tells whether the i-th pair also generates an event
+            (all of them do by default).
+        """
+        if events is None:
+            events = itertools.repeat(True)
         builder = asiodnp3.UpdateBuilder()
-        # First update the static value
-        builder.Update(value, index)
-        # Then update the event buffer
-        builder.Update(value, index, opendnp3.EventMode.Force)
-        update = builder.Build()
-        self.outstation.Apply(update)
-        self.db_handler.process(value, index)
-        _log.debug(f'Successfully recorded update for index={index}, value={value.value}')
+        for (value, index), event in zip(values_and_indexes, events):
+            # First update the static value, without the change detection of the database (deadband 0),
+            # which would add a second event for every changed value
+            builder.Update(value, index, opendnp3.EventMode.Suppress)
+            # Then update the event buffer
+            if event:
+                builder.Update(value, index, opendnp3.EventMode.Force)
+        self.outstation.Apply(builder.Build())
+        if self.db_handler is not None:
+            self.db_handler.process_many(values_and_indexes)
+        _log.debug(f'Successfully recorded {len(values_and_indexes)} updates.')
 
     # Required IOutstationApplication methods
     def ColdRestartSupport(self):
@@ -185,23 +280,46 @@ class AppChannelListener(asiodnp3.IChannelListener):
         _log.debug(f'In AppChannelListener.OnStateChange: state={state}')
 
 class OutstationCommandHandler(opendnp3.ICommandHandler):
-    def __init__(self, master_station=None):
+    def __init__(self, master_station=None, routes=None):
+        """
+        :param master_station: upstream master of the AO commands missing in routes, with the same index
+        :param routes: local AO index -> (upstream master station, upstream AO index)
+        """
         super(OutstationCommandHandler, self).__init__()
         self.master_station = master_station
+        self.routes = routes or {}
+        # AO commands of one request, forwarded together in End()
+        self._pending_commands = {}
         
     def Start(self):
         _log.debug('In OutstationCommandHandler.Start')
+        self._pending_commands = {}
         
     def End(self):
         _log.debug('In OutstationCommandHandler.End')
+        if self._pending_commands:
+            latency.stamp(latency.HOP_OPERATED)
+            # One request per upstream outstation
+            for master_station, commands in self._route(self._pending_commands).items():
+                master_station.send_direct_point_commands(40, 4, commands)
+        self._pending_commands = {}
+
+    def _route(self, commands):
+        """{upstream master station: {upstream AO index: value}} of the local AO commands"""
+        routed = {}
+        for index, value in commands.items():
+            master_station, upstream_index = self.routes.get(index, (self.master_station, index))
+            routed.setdefault(master_station, {})[upstream_index] = value
+        return routed
         
     def Select(self, command, index):
         return opendnp3.CommandStatus.SUCCESS
     
     def Operate(self, command, index, op_type):
         _log.debug(f'{command.__class__.__name__} command received: index={index}, value={command.value}, op_type={op_type}')
-        if self.master_station and isinstance(command, opendnp3.AnalogOutputDouble64):
-            self.master_station.send_direct_point_command(40, 4, index, command.value)
+        if isinstance(command, opendnp3.AnalogOutputDouble64) and \
+                (index in self.routes or self.master_station is not None):
+            self._pending_commands[index] = command.value
         OutstationApplication.process_point_value('Operate', command, index, op_type)
         return opendnp3.CommandStatus.SUCCESS
 
@@ -236,57 +354,145 @@ class DBHandler:
             self.db[command.__class__.__name__] = update_body
             _log.debug(f'Created new database entry: {command.__class__.__name__}[{index}] = {command.value}')
 
-def main():
+    def process_many(self, commands_and_indexes):
+        """process() of a whole batch, one dictionary update per type"""
+        for type_name, group in itertools.groupby(commands_and_indexes, key=lambda pair: pair[0].__class__.__name__):
+            self.db.setdefault(type_name, {}).update((index, command.value) for command, index in group)
+
+def load_point_map(path=None) -> dict:
+    """
+        Reads the point map from a JSON file (DEFAULT_POINT_MAP without a path) with the analogs mapped as
+        {upstream index: local index} and the analog outputs as {local index: upstream index}.
+    """
+    point_map = DEFAULT_POINT_MAP
+    if path is not None:
+        with open(path) as file:
+            point_map = json.load(file)
+
+    upstreams = []
+    for upstream in point_map["upstreams"]:
+        analogs, analog_outputs = upstream.get("analogs", []), upstream.get("analog_outputs", [])
+        if isinstance(analogs, list):
+            analogs = dict(enumerate(analogs))
+        if isinstance(analog_outputs, list):
+            analog_outputs = dict(enumerate(analog_outputs))
+        upstreams.append({**upstream,
+                          "analogs": {int(index): int(local) for index, local in analogs.items()},
+                          "analog_outputs": {int(local): int(index) for index, local in analog_outputs.items()}})
+
+    for kind, key in [("analog", "analogs"), ("analog output", "analog_outputs")]:
+        local_indexes = [local for upstream in upstreams
+                         for local in (upstream[key].values() if key == "analogs" else upstream[key])]
+        if len(local_indexes) != len(set(local_indexes)):
+            raise ValueError(f"A local {kind} index is mapped more than once in the point map.")
+    return {"local": point_map["local"], "upstreams": upstreams,
+            "concurrency_hint": point_map.get("concurrency_hint", len(upstreams) + 1)}
+
+
+def make_deadband_filter(num_analogs, deadband=0.0, deadband_percentage=0.0, deadbands_file=None,
+                         change_detection=False):
+    """DeadbandFilter of the command line options, None when none of them asks for one"""
+    if deadbands_file:
+        return DeadbandFilter.from_file(deadbands_file, num_analogs, deadband, deadband_percentage)
+    if change_detection or deadband > 0 or deadband_percentage > 0:
+        return DeadbandFilter(num_analogs, deadband, deadband_percentage)
+    return None
+
+
+def main(point_map_path=None, deadband=0.0, deadband_percentage=0.0, deadbands_file=None, change_detection=False,
+         unsolicited=False, integrity_period=UNSOLICITED_INTEGRITY_PERIOD):
     logs_file = "logs/d_r_lfc_forwarder.log"
-    
-    initial_analogs = [377, 377, 377, 377, 377, 377, 377, 377, 377, 377,
-                       -4.77014, 229.987, 93.0968, 124.107, 4.79325, -229.561, -92.8474, -123.898]
-    
-    # External outstation connection details (where we get data from)
-    external_outstation_ip = "172.24.14.211"
-    external_outstation_port = 20000
-    external_outstation_id = 2
-    external_master_id = 1
-    
-    # Local outstation details (where LFC_master.py will connect to)
-    local_outstation_ip = "0.0.0.0"
-    local_outstation_port = 20003
-    local_outstation_id = 4
-    local_master_id = 3
-    
-    # Initialize master to connect to external outstation
-    master = MasterStation(outstation_ip=external_outstation_ip, 
-                          port=external_outstation_port, 
-                          master_id=external_master_id,
-                          outstation_id=external_outstation_id)
-    
-    # Initialize outstation with command handler that has reference to master
-    handler = OutstationCommandHandler(master_station=master)
-    outstation_app = OutstationApplication(local_outstation_ip,
-                                           local_outstation_port,
-                                           local_outstation_id,
-                                           local_master_id,
+    point_map = load_point_map(point_map_path)
+    local = point_map["local"]
+    upstreams = point_map["upstreams"]
+
+    # Sized to hold every mapped point and the initial values
+    num_analogs = max([len(local.get("initial_analogs", []))] +
+                      [index + 1 for upstream in upstreams for index in upstream["analogs"].values()])
+    num_ao_statuses = max([0] + [index + 1 for upstream in upstreams for index in upstream["analog_outputs"]])
+
+    # Masters of the upstream (external) outstations, where we get data from, and the local outstation,
+    # all in the shared manager
+    set_num_threads(point_map["concurrency_hint"])
+    masters = [MasterStation(outstation_ip=upstream["ip"],
+                             port=upstream["port"],
+                             master_id=upstream["master_id"],
+                             outstation_id=upstream["outstation_id"])
+               for upstream in upstreams]
+
+    # Local outstation (where LFC_master.py will connect to), its command handler sends each AO command
+    # to the upstream outstation of its index
+    routes = {local_index: (master, upstream_index)
+              for upstream, master in zip(upstreams, masters)
+              for local_index, upstream_index in upstream["analog_outputs"].items()}
+    handler = OutstationCommandHandler(routes=routes)
+    outstation_app = OutstationApplication(local["ip"],
+                                           local["port"],
+                                           local["outstation_id"],
+                                           local["master_id"],
                                            cmd_handler = handler,
-                                           initial_analogs = initial_analogs)
+                                           initial_analogs = local.get("initial_analogs"),
+                                           shadow_db = False,
+                                           num_analogs = num_analogs,
+                                           num_ao_statuses = num_ao_statuses,
+                                           unsolicited = unsolicited)
     outstation_thread = threading.Thread(target=outstation_app.enable, daemon=True)
     outstation_thread.start()
     
-    soe_handler = ForwarderSOEHandler(logs_file, 
-                                      station_ref=master,
-                                      outstation_app=outstation_app)
-    master.configure_master(soe_handler, external_outstation_ip, external_outstation_port)
-    
-    # Start master thread
-    master_thread = threading.Thread(target=master.start, daemon=True)
-    master_thread.start()
+    deadband_filters = []
+    for upstream, master in zip(upstreams, masters):
+        # One filter per upstream, their SOE handlers run on different threads of the manager
+        deadband_filter = make_deadband_filter(num_analogs, deadband, deadband_percentage, deadbands_file,
+                                               change_detection)
+        soe_handler = ForwarderSOEHandler(logs_file, 
+                                          station_ref=master,
+                                          outstation_app=outstation_app,
+                                          deadband_filter=deadband_filter,
+                                          index_map=upstream["analogs"],
+                                          name=upstream.get("name", f"{upstream['ip']}:{upstream['port']}"),
+                                          fast_path=True)
+        master.configure_master(soe_handler, upstream["ip"], upstream["port"],
+                                unsolicited=upstream.get("unsolicited", False), integrity_period=integrity_period)
+        master.start()
+        deadband_filters.append((soe_handler.name, deadband_filter))
+    _log.info(f'Forwarding {len(upstreams)} upstream outstations with {point_map["concurrency_hint"]} threads.')
     
     try:
         while True:
             time.sleep(1)
     finally:
+        for name, deadband_filter in deadband_filters:
+            if deadband_filter is not None:
+                _log.info(f'Deadband filter of {name}: {deadband_filter.summary()}')
         outstation_app.shutdown()
-        del master
+        del masters
         exit()
 
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Forwards the measurements of the upstream outstations to the local "
+                                                 "one and the commands of LFC_master back.")
+    parser.add_argument("--point-map", required=False, metavar="FILE",
+                        help="JSON file with the local outstation and the upstream ones, laid out as DEFAULT_POINT_MAP "
+                             "(the single RTDS outstation) which is used by default.")
+    parser.add_argument("--unsolicited", required=False, action="store_true",
+                        help="Let LFC_master enable the unsolicited responses of the local outstation.")
+    parser.add_argument("--integrity-period", required=False, type=int, default=UNSOLICITED_INTEGRITY_PERIOD,
+                        help="Period (ms) of the integrity polls of the unsolicited upstream outstations.")
+    parser.add_argument("--change-detection", required=False, action="store_true",
+                        help="Generate events only for the values that changed, the static values are always updated.")
+    parser.add_argument("--deadband", required=False, type=float, default=0.0,
+                        help="Absolute deadband of all the points, in the forwarded units (rad/s, MW). "
+                             "Implies --change-detection.")
+    parser.add_argument("--deadband-percentage", required=False, type=float, default=0.0,
+                        help="Deadband of all the points in %% of their last forwarded value. Implies --change-detection.")
+    parser.add_argument("--deadbands", required=False, metavar="FILE",
+                        help='Per point deadbands, a JSON file {"<index>": {"absolute": ..., "percentage": ...}}. '
+                             'The missing ones default to --deadband and --deadband-percentage.')
+    return parser.parse_args()
+
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    args = parse_arguments()
+    main(args.point_map, args.deadband, args.deadband_percentage, args.deadbands, args.change_detection,
+         args.unsolicited, args.integrity_period)
\ No newline at end of file
@@ -1,128 +1,116 @@
 import threading
 import time
 
+import numpy as np
+
 from cosim.mylogging import getLogger
+from cosim.watchdog import Watchdog
 
 
 _log = getLogger(__name__, "logs/LFCHandler.log")
 
+MAX_DISCONNECTION_TIME = 5 # sec
+
+# IEEE 39 bus, 3 areas. Measurements 0-9 are the generator speeds, 10-17 the tie line flows.
+# Area of each generator, -1 if the generator speed is not used by the LFC
+GEN_TO_AREA_39BUS = [1, -1, 2, -1, -1, 0, -1, -1, -1, -1]
+TIE_LINE_INDICES_39BUS = [10, 11, 12, 13, 14, 15, 16, 17]
+# Tie lines:                   13_T19 12_T21 23_T05 23_T02 31_T19 21_T21 32_T05 32_T02
+TIE_LINE_INCIDENCE_39BUS = [[     1,     1,     0,     0,     0,     0,     0,     0], # area 1
+                            [     0,     0,     1,     1,     0,     1,     0,     0], # area 2
+                            [     0,     0,     0,     0,     1,     0,     1,     1]] # area 3
+TIE_LINE_SCHEDULED_39BUS = [225.21686, -12.3572, -211.95215] # MW, scheduled interchange of each area
+
 
 class LFCHandler:
-    def __init__(self):   
-        self._timer_lock = threading.Lock()
+    """
+        Integral LFC for N control areas.
+
+        All ACEs are updated with one matrix-vector product per scan:
+            error = A @ measurements + b
+            integral += -K_I * dt * error
+        where A maps the generator speeds (averaged per area, scaled by beta / base speed) and the tie line
+        flows (per unit of the base power) of the measurements vector onto the areas.
+    """
+    def __init__(self, gen_to_area=GEN_TO_AREA_39BUS, tie_line_indices=TIE_LINE_INDICES_39BUS,
+                 tie_line_incidence=TIE_LINE_INCIDENCE_39BUS, tie_line_scheduled=TIE_LINE_SCHEDULED_39BUS,
+                 gen_speed_indices=None):
         self._vars_lock = threading.Lock()
-         
+
         # LFC parameters
         self._K_I = 0.005
         self._base_rotor_speed = 377
         self._beta = 20
-        
+        self._base_power = 100 # MVA
+
+        self._num_areas = len(tie_line_scheduled)
+        self._A, self._b = self._build_area_matrix(gen_to_area, gen_speed_indices, tie_line_indices,
+                                                   tie_line_incidence, tie_line_scheduled)
+
         # LFC variables
         self._reset_controller_vars()
-        
-        controller_reset_handler = threading.Thread(
-        target=self._reset_controller_when_no_connection, daemon=True)
-        controller_reset_handler.start()
-        
-    
-    def get_updated_ACEs(self, visitor_index_and_value):
-        self._reset_timer()
-        self._calculate_tie_lines(visitor_index_and_value)
-        self._calculate_ACEs_from_LFC(visitor_index_and_value)
-        return [self._ACE1_1, self._ACE2_1, self._ACE3_1]
-    
-    
+
+        self._watchdog_entry = Watchdog.get().register(self.__class__.__name__, MAX_DISCONNECTION_TIME,
+                                                       self._reset_controller_when_no_connection)
+
+
+    @property
+    def num_areas(self):
+        return self._num_areas
+
+
+    def get_updated_ACEs(self, measurements):
+        self._watchdog_entry.feed()
+        return self._calculate_ACEs_from_LFC(measurements)
+
+
+    def _build_area_matrix(self, gen_to_area, gen_speed_indices, tie_line_indices,
+                           tie_line_incidence, tie_line_scheduled):
+        gen_to_area = np.asarray(gen_to_area)
+        if gen_speed_indices is None:
+            gen_speed_indices = np.arange(gen_to_area.shape[0])
+        tie_line_incidence = np.asarray(tie_line_incidence, dtype=np.float64)
+        assert tie_line_incidence.shape == (self._num_areas, len(tie_line_indices)), \
+            "Tie line incidence matrix must be of shape [num_areas, num_tie_lines]"
+
+        num_measurements = max(np.max(gen_speed_indices), np.max(tie_line_indices)) + 1
+        A = np.zeros((self._num_areas, num_measurements))
+        # Area speed as the average speed of its generators
+        for area in range(self._num_areas):
+            area_gens = np.asarray(gen_speed_indices)[gen_to_area == area]
+            assert area_gens.shape[0] > 0, f"No generator assigned to area {area + 1}"
+            A[area, area_gens] = self._beta / self._base_rotor_speed / area_gens.shape[0]
+        A[:, tie_line_indices] += tie_line_incidence / self._base_power
+        b = -self._beta - np.asarray(tie_line_scheduled, dtype=np.float64) / self._base_power
+        return A, b
+
+
     def _reset_controller_vars(self):
         self._vars_lock.acquire()
-        self._ACE1_1 = 0.0
-        self._ACE2_1 = 0.0
-        self._ACE3_1 = 0.0
-        self._integral1 = 0.0
-        self._integral2 = 0.0
-        self._integral3 = 0.0
+        self._integrals = np.zeros(self._num_areas)
         self._prev_time = 0.0
-        self._tie_lines = [0.0, 0.0, 0.0]
         self._vars_lock.release()
-    
-    
+
+
     def _reset_controller_when_no_connection(self):
-        max_disconnection_time = 5
-        
-        while(True):
-            self._reset_timer()
-            while(self._timer < max_disconnection_time):
-                time.sleep(1)
-                self._increment_timer()
-            self._reset_controller_vars()
-            _log.info(f"No connection for {max_disconnection_time} sec. LFC handler reset.")
- 
-    
-    def _reset_timer(self):
-        self._timer_lock.acquire()
-        self._timer = 0
-        self._timer_lock.release()
-        
-        
-    def _increment_timer(self):
-        self._timer_lock.acquire()
-        self._timer += 1
-        self._timer_lock.release()
-    
-    
-    def _calculate_tie_lines(self, visitor_index_and_value):
-        tl_13_T19 = visitor_index_and_value[10][1] # tie line from area 1 to 3, line number 19
-        tl_12_T21 = visitor_index_and_value[11][1] # the rest by analogy
-        tl_23_T05 = visitor_index_and_value[12][1] 
-        tl_23_T02 = visitor_index_and_value[13][1] 
-        tl_31_T19 = visitor_index_and_value[14][1]
-        tl_21_T21 = visitor_index_and_value[15][1]
-        tl_32_T05 = visitor_index_and_value[16][1]
-        tl_32_T02 = visitor_index_and_value[17][1]
-        
-        self._tie_lines[0] = (tl_13_T19 + tl_12_T21 - 225.21686) / 100
-        self._tie_lines[1] = (tl_21_T21 + tl_23_T02 + tl_23_T05 + 12.3572) / 100
-        self._tie_lines[2] = (tl_31_T19 + tl_32_T02 + tl_32_T05 + 211.95215) / 100
-        _log.info(f"TL 1: {self._tie_lines[0]} || TL 2: {self._tie_lines[1]} || TL 3: {self._tie_lines[2]}")
-    
-    
-    def _calculate_ACEs_from_LFC(self, visitor_index_and_value):
+        self._reset_controller_vars()
+        _log.info(f"No connection for {MAX_DISCONNECTION_TIME} sec. LFC handler reset.")
+
+
+    def _calculate_ACEs_from_LFC(self, measurements):
+        errors = self._A @ measurements[:self._A.shape[1]] + self._b
+
+        self._vars_lock.acquire()
         curr_time = time.time_ns()
         if self._prev_time == 0:
-            self._set_prev_time(curr_time - 1)
+            self._prev_time = curr_time - 1
         time_diff_in_sec = (curr_time - self._prev_time) / 1_000_000_000
-        self._set_prev_time(curr_time)
-        
-        speed_6 = visitor_index_and_value[5][1] # for ACE1_1
-        self._update_LFC_controller(1, speed_6, time_diff_in_sec)
-        self._ACE1_1 = self._integral1 #0.02857
-            
-        speed_1 = visitor_index_and_value[0][1] # for ACE2_1
-        self._update_LFC_controller(2, speed_1, time_diff_in_sec)
-        self._ACE2_1 = self._integral2 #0.02574
-        
-        speed_3 = visitor_index_and_value[2][1] # for ACE3_1    
-        self._update_LFC_controller(3, speed_3, time_diff_in_sec)
-        self._ACE3_1 = self._integral3 #0.02371
-        
-        _log.info(f"Gen 1 | Speed: {speed_1} || Gen 3 | Speed: {speed_3} || Gen 6 | Speed: {speed_6}")
-        _log.info(f"ACE1_1: {self._ACE1_1} || ACE2_1: {self._ACE2_1} || ACE3_1: {self._ACE3_1}")    
-                
-    
-    def _set_prev_time(self, new_time):
-        self._vars_lock.acquire()
-        self._prev_time = new_time
+        self._prev_time = curr_time
+
+        errors *= -self._K_I * time_diff_in_sec
+        self._integrals += errors
+        ACEs = self._integrals.copy()
         self._vars_lock.release()
-        
-        
-    def _update_LFC_controller(self, area_num, freq, time_diff):
-        error = (freq - self._base_rotor_speed) / self._base_rotor_speed * self._beta + self._tie_lines[area_num-1]
-        new_value = error * -self._K_I * time_diff
-        
-        self._vars_lock.acquire()
-        if area_num == 1:
-            self._integral1 += new_value
-        elif area_num == 2:
-            self._integral2 += new_value
-        elif area_num == 3:
-            self._integral3 += new_value
-        self._vars_lock.release()
\ No newline at end of file
+
+        _log.info(f"ACEs: {ACEs.tolist()}")
+        return ACEs
@@ -1,3 +1,4 @@
+import argparse
 import logging
 import threading
 import time
@@ -5,34 +6,58 @@ import time
 from pydnp3.opendnp3 import GroupVariation
 from dnp3_python.dnp3station.visitors import *
 
+from cosim import latency
 from cosim.dnp3.lfc import LFC_handler, UFLS_handler
 from cosim.dnp3.soe_handler import SOEHandlerAdjusted
-from cosim.dnp3.master import MasterStation
+from cosim.dnp3.master import MasterStation, UNSOLICITED_INTEGRITY_PERIOD
+from cosim.dnp3.point_table import PointTable
 
 _log = logging.getLogger(__name__)
 SCALING_TO_INT = 1000000
+# Static values of the polls and events of the unsolicited responses (and of the event polls)
+MEASUREMENT_GVS = [GroupVariation.Group30Var1, GroupVariation.Group32Var1, GroupVariation.Group32Var3]
 
 class IEEE39BusSOEHandler(SOEHandlerAdjusted):
-    def __init__(self, log_file_path="logs/soehandler.log", soehandler_log_level=logging.INFO, station_ref=None, *args, **kwargs):
+    def __init__(self, log_file_path="logs/soehandler.log", soehandler_log_level=logging.INFO, station_ref=None, LFC_handler_ref=None, *args, **kwargs):
         super().__init__(log_file_path, soehandler_log_level, station_ref, *args, **kwargs)
-        self._LFC_handler = LFC_handler.LFCHandler()
+        # Defaults to the 3 area IEEE 39 bus configuration, pass an LFCHandler built for another system to override
+        self._LFC_handler = LFC_handler_ref if LFC_handler_ref is not None else LFC_handler.LFCHandler()
         self._UFLS_handler = UFLS_handler.UFLSHandler()
+        # Measurements merged from the static values and the events, the ACEs are computed at the end of each response
+        self._measurements = PointTable()
+        self._measurements_updated = False
     
     
     def _process_incoming_data(self, info_gv, visitor_index_and_value):
-        if info_gv in [GroupVariation.Group30Var1]:            
+        if info_gv in MEASUREMENT_GVS:
+            # The latest value of every point, whichever header it came in
+            now = time.time_ns()
             for index, value in visitor_index_and_value:
-                visitor_index_and_value[index] = (index, value/SCALING_TO_INT)
-            ACEs = self._LFC_handler.get_updated_ACEs(visitor_index_and_value)
-            load_to_shed = self._UFLS_handler.get_percentage_of_load_to_shed(visitor_index_and_value)
-            
-            self.station_ref.send_direct_point_command(40, 4, 0, ACEs[0])
-            self.station_ref.send_direct_point_command(40, 4, 1, ACEs[1])
-            self.station_ref.send_direct_point_command(40, 4, 2, ACEs[2])
-            self.station_ref.send_direct_point_command(40, 4, 3, load_to_shed)
+                self._measurements.write(index, value, 0, now)
+            self._measurements_updated = True
+
+    def Start(self):
+        super().Start()
+        self._measurements_updated = False
+
+    def End(self):
+        super().End()
+        # One computation per response, an unsolicited one carries just the changed points
+        if not self._measurements_updated:
+            return
+        self._measurements_updated = False
+        measurements = self._measurements.values / SCALING_TO_INT
+        ACEs = self._LFC_handler.get_updated_ACEs(measurements)
+        load_to_shed = self._UFLS_handler.get_percentage_of_load_to_shed(measurements)
+
+        # AO points: one ACE per area followed by the load to shed, all in one request
+        commands = dict(enumerate(ACEs.tolist()))
+        commands[len(ACEs)] = load_to_shed
+        latency.stamp(latency.HOP_COMPUTED)
+        self.station_ref.send_direct_point_commands(40, 4, commands)
 
         
-def main():
+def main(unsolicited=False, integrity_period=UNSOLICITED_INTEGRITY_PERIOD):
     logs_file = "logs/d_r_lfc_master.log"
     outstation_ip = "192.168.0.1"
     port = 20003
@@ -40,8 +65,9 @@ def main():
     master_id = 3
     
     master = MasterStation(outstation_ip=outstation_ip, port=port, master_id=master_id, outstation_id=outstation_id, logs_file=logs_file)
-    soe_handler = IEEE39BusSOEHandler(logs_file, station_ref=master)
-    master.configure_master(soe_handler, outstation_ip, port)
+    soe_handler = IEEE39BusSOEHandler(logs_file, station_ref=master, fast_path=True)
+    master.configure_master(soe_handler, outstation_ip, port, unsolicited=unsolicited,
+                            integrity_period=integrity_period)
     
     master_thread = threading.Thread(target=master.start, daemon=True)
     master_thread.start()
@@ -53,5 +79,16 @@ def main():
         exit()
 
     
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="LFC and UFLS master of the forwarder's outstation.")
+    parser.add_argument("--unsolicited", required=False, action="store_true",
+                        help="Get the measurements as unsolicited responses (start the forwarder with --unsolicited) "
+                             "instead of polling them every second.")
+    parser.add_argument("--integrity-period", required=False, type=int, default=UNSOLICITED_INTEGRITY_PERIOD,
+                        help="Period (ms) of the integrity polls in the unsolicited mode.")
+    return parser.parse_args()
+
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    args = parse_arguments()
+    main(args.unsolicited, args.integrity_period)
\ No newline at end of file
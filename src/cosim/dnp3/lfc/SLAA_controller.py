@@ -7,6 +7,8 @@ from cosim.dnp3.lfc.LFC_master import MasterStation
 
 _log = getLogger(__name__, "logs/d_r_lfc_slaa.log")
 
+MASTER2_SCAN_TIME = 60000 # ms, the fast scan of an unconfigured MyMaster
+
 class SLAASOEHandler(SOEHandlerAdjusted):
     def __init__(self, log_file_path="logs/soehandler.log", soehandler_log_level=logging.INFO, station_ref=None, station_ref2=None, attack_time=30, loads=[0]*18, *args, **kwargs):
         super().__init__(log_file_path, soehandler_log_level, station_ref, *args, **kwargs)
@@ -27,12 +29,15 @@ class SLAASOEHandler(SOEHandlerAdjusted):
 
     def _process_incoming_data(self, info_gv, visitor_ind_val):
           if self._can_attack:
+              attacks, attacks2 = {}, {}
               for i, load_change in enumerate(self._loads): 
                 if load_change != 1.0:
                     if i < 10:
-                        self.station_ref.send_direct_point_command(40, 4, i, load_change)
+                        attacks[i] = load_change
                     else:
-                        self.station_ref2.send_direct_point_command(40, 4, i, load_change)
+                        attacks2[i] = load_change
+              self.station_ref.send_direct_point_commands(40, 4, attacks)
+              self._station_ref2.send_direct_point_commands(40, 4, attacks2)
             
 
 def main():
@@ -52,6 +57,9 @@ def main():
     master2 = MasterStation(outstation_ip=outstation_ip2, port=port2, master_id=1, outstation_id=2, log_handler=None)
     soe_handler = SLAASOEHandler(logs_file, station_ref=master, station_ref2=master2, attack_time=attack_time, loads=loads)
     master.configure_master(soe_handler, outstation_ip, port, scan_time=step_time)
+    # Only sends the commands, its channel moves to the shared manager as well
+    master2.configure_master(SOEHandlerAdjusted(logs_file, station_ref=master2), outstation_ip2, port2,
+                             scan_time=MASTER2_SCAN_TIME)
     master.start()
     master2.start()
     
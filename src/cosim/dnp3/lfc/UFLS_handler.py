@@ -22,9 +22,9 @@ class UFLSHandler:
         self._percentage_of_load_to_shed = 0.0
     
     
-    def get_percentage_of_load_to_shed(self, visitor_index_and_value):
+    def get_percentage_of_load_to_shed(self, measurements):
         # taking speed of 3rd generator
-        speed = visitor_index_and_value[2][1]
+        speed = measurements[2]
         freq = speed / self._NOMINAL_SPEED * self._NOMINAL_FREQ
         prev_freq = 0.0
         
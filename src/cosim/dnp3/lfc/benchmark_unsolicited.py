@@ -0,0 +1,158 @@
+import argparse
+import logging
+import os
+import sys
+import time
+
+from pydnp3 import opendnp3
+
+from cosim.dnp3.lfc.LFC_forwarder import DEFAULT_POINT_MAP, OutstationApplication, OutstationCommandHandler
+from cosim.dnp3.lfc.LFC_master import IEEE39BusSOEHandler, SCALING_TO_INT
+from cosim.dnp3.master import MasterStation, UNSOLICITED_INTEGRITY_PERIOD
+from cosim.dnp3.soe_handler import SOEHandlerAdjusted
+from cosim.latency import HdrHistogram
+
+
+MODES = ("polling", "unsolicited")
+LOG_FILE = "logs/benchmark_unsolicited.log"
+
+# The stations of the finished benchmarks. pydnp3 crashes when their objects are garbage collected after the
+# managers shut down, so they stay referenced until the process exits.
+_stopped_stations = []
+
+
+class ProbeSOEHandler(SOEHandlerAdjusted):
+    """
+        Master side of the benchmark: point 0 carries the sequence number of the update, the latency of every
+        sequence number is recorded when it arrives first (as an event or a static value).
+    """
+    def __init__(self, send_times_ns, *args, **kwargs):
+        super().__init__(LOG_FILE, logging.WARNING, *args, **kwargs)
+        self.histogram = HdrHistogram()
+        self._send_times_ns = send_times_ns
+        self._last_seq = 0
+
+    def _process_incoming_data(self, info_gv, visitor_index_and_value):
+        now = time.monotonic_ns()
+        for index, value in visitor_index_and_value:
+            seq = int(value)
+            if index == 0 and self._last_seq < seq < len(self._send_times_ns):
+                self.histogram.record(now - self._send_times_ns[seq])
+                self._last_seq = seq
+
+
+def _start_pair(mode, port, scan_time, integrity_period, event_buffer_size):
+    """Local outstation and its master in the given reporting mode"""
+    unsolicited = mode == "unsolicited"
+    outstation_app = OutstationApplication("127.0.0.1", port, 10, 1, cmd_handler=OutstationCommandHandler(),
+                                           initial_analogs=None, shadow_db=False, num_analogs=1, num_ao_statuses=0,
+                                           unsolicited=unsolicited, event_buffer_size=event_buffer_size)
+    outstation_app.enable()
+    send_times_ns = [0]
+    master = MasterStation(outstation_ip="127.0.0.1", port=port, master_id=1, outstation_id=10)
+    soe_handler = ProbeSOEHandler(send_times_ns, station_ref=master, fast_path=True)
+    master.configure_master(soe_handler, "127.0.0.1", port, scan_time=scan_time, unsolicited=unsolicited,
+                            integrity_period=integrity_period)
+    master.start()
+    return outstation_app, master, soe_handler, send_times_ns
+
+
+def benchmark(rate=20.0, duration=10.0, scan_time=1000, integrity_period=UNSOLICITED_INTEGRITY_PERIOD, port=20400):
+    """
+        Runs a polled and an unsolicited outstation-master pair side by side on the loopback, both fed the same
+        updates at `rate` Hz for `duration` seconds. Returns {mode: (latency HdrHistogram, number of updates)}.
+    """
+    # The polled outstation keeps the events of a whole scan period
+    event_buffer_size = max(100, int(2 * rate * scan_time / 1000))
+    pairs = {mode: _start_pair(mode, port + i, scan_time, integrity_period, event_buffer_size)
+             for i, mode in enumerate(MODES)}
+    time.sleep(2) # connect, startup integrity polls and unsolicited enabling
+
+    num_updates = int(rate * duration)
+    for seq in range(1, num_updates + 1):
+        for outstation_app, _, _, send_times_ns in pairs.values():
+            send_times_ns.append(time.monotonic_ns())
+            outstation_app.apply_updates([(opendnp3.Analog(seq), 0)])
+        time.sleep(1 / rate)
+    time.sleep(scan_time / 1000 + 1) # the last poll
+
+    results = {mode: (soe_handler.histogram, num_updates) for mode, (_, _, soe_handler, _) in pairs.items()}
+    # The masters first, an outstation shut down under a connected master takes the process down
+    for _, master, _, _ in pairs.values():
+        master.shutdown()
+    for outstation_app, _, _, _ in pairs.values():
+        outstation_app.shutdown()
+    _stopped_stations.append(pairs)
+    return results
+
+
+class _CountingMasterStation(MasterStation):
+    """Counts the AO requests of its handler instead of sending them, one per ACE computation"""
+    num_requests = 0
+
+    def send_direct_point_commands(self, group, variation, index_and_value, call_back=None, config=None):
+        self.num_requests += 1
+
+
+def check_lfc_master(rate=5.0, duration=8.0, port=20410):
+    """
+        Runs the LFC master's handler against an unsolicited outstation of the forwarder on the loopback and
+        checks that it computes the ACEs on every event, not only on the integrity polls. Returns
+        (number of ACE computations, number of updates).
+    """
+    initial_analogs = DEFAULT_POINT_MAP["local"]["initial_analogs"]
+    outstation_app = OutstationApplication("127.0.0.1", port, 10, 1, cmd_handler=OutstationCommandHandler(),
+                                           initial_analogs=initial_analogs, shadow_db=False, unsolicited=True)
+    outstation_app.enable()
+    master = _CountingMasterStation(outstation_ip="127.0.0.1", port=port, master_id=1, outstation_id=10)
+    soe_handler = IEEE39BusSOEHandler(LOG_FILE, logging.WARNING, station_ref=master, fast_path=True)
+    master.configure_master(soe_handler, "127.0.0.1", port, unsolicited=True)
+    master.start()
+    time.sleep(2) # connect, startup integrity poll and unsolicited enabling
+
+    num_startup_requests = master.num_requests
+    num_updates = int(rate * duration)
+    for seq in range(1, num_updates + 1):
+        # A small swing of the first generator speed, one event per update
+        speed = initial_analogs[0] + 0.01 * (seq % 2)
+        outstation_app.apply_updates([(opendnp3.Analog(speed * SCALING_TO_INT), 0)])
+        time.sleep(1 / rate)
+    time.sleep(1)
+
+    num_computations = master.num_requests - num_startup_requests
+    master.shutdown()
+    outstation_app.shutdown()
+    _stopped_stations.append((outstation_app, master, soe_handler))
+    return num_computations, num_updates
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Compares the measurement latency of the polled and the unsolicited "
+                                                 "DNP3 reporting, with an outstation-master pair of each on the loopback.")
+    parser.add_argument("-r", "--rate", required=False, type=float, default=20.0, help="Updates per second.")
+    parser.add_argument("-d", "--duration", required=False, type=float, default=10.0, help="Seconds of updates.")
+    parser.add_argument("--scan-time", required=False, type=int, default=1000, help="Poll period (ms) of the polling mode.")
+    parser.add_argument("--integrity-period", required=False, type=int, default=UNSOLICITED_INTEGRITY_PERIOD,
+                        help="Integrity poll period (ms) of the unsolicited mode.")
+    parser.add_argument("--port", required=False, type=int, default=20400, help="First of the two local ports.")
+    parser.add_argument("--check-lfc-master", required=False, action="store_true",
+                        help="Instead of the benchmark, check that the LFC master computes the ACEs on every "
+                             "unsolicited event (exits with 1 when it does not).")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    if args.check_lfc_master:
+        num_computations, num_updates = check_lfc_master(port=args.port)
+        print(f"LFC master: {num_computations} ACE computations for {num_updates} unsolicited updates")
+        sys.stdout.flush()
+        logging.shutdown()
+        os._exit(0 if num_computations >= num_updates else 1)
+    results = benchmark(args.rate, args.duration, args.scan_time, args.integrity_period, args.port)
+    for mode, (histogram, num_updates) in results.items():
+        print(f"{mode:>11}: {histogram.summary()}, {num_updates - histogram.count} of {num_updates} updates missed")
+    # Skips the garbage collection of the stopped stations at exit, see _stopped_stations
+    sys.stdout.flush()
+    logging.shutdown()
+    os._exit(0)
@@ -1,23 +1,26 @@
+import sys
+
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
 
+from cosim.trace import load_trace
+
 sns.set_theme(style="whitegrid", context="paper")
 sns.set_palette(sns.color_palette("hsv", 10))
 
-def draw_freq(freqs):
-    timestep = 0.1
-    time = np.arange(0, freqs.shape[1] * timestep, timestep)[:freqs.shape[1]]
+def draw_freq(freqs, time, names):
     plt.figure(figsize=(6, 4))
     for i in range(freqs.shape[0]):
-        sns.lineplot(x=time, y=freqs[i, :], label=f"Freq {i+1}", linewidth=1.5)
+        sns.lineplot(x=time, y=freqs[i, :], label=names[i], linewidth=1.5)
     plt.xlabel('Time (s)', fontsize=10)
     plt.ylabel('Frequency (Hz)', fontsize=10)
     plt.title('Frequency vs Time', fontsize=12)
     plt.tight_layout()
     plt.show()
 
-with open('./logs/freqs.log') as f:
-    freqs = [line.strip().split(",") for line in f.readlines()]
-    freqs = np.array(freqs, dtype=float).T
-    draw_freq(freqs)
\ No newline at end of file
+if __name__ == "__main__":
+    # Frequencies measured by the MDLAA handler, in Hz, with their monotonic timestamps
+    names, records = load_trace(sys.argv[1] if len(sys.argv) > 1 else './logs/MDLAA_freqs.trace')
+    time = (records['time_ns'] - records['time_ns'][0]) * 1e-9
+    draw_freq(np.asarray(records['values']).T, time, names)
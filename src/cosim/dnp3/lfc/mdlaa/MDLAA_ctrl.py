@@ -0,0 +1,501 @@
+import numpy as np
+import argparse
+import logging
+import os
+import queue
+import threading
+import time
+
+from functools import partial
+from multiprocessing import Process
+
+from cosim.mylogging import getLogger
+from cosim.trace import TraceWriter
+from cosim.watchdog import Watchdog
+from cosim.dnp3.lfc.mdlaa.constants import MILLI, MICRO, NOMINAL_FREQ, step_time, MDLAA_PARAMS, consts_39BUS, consts_KUNDUR
+from cosim.dnp3.lfc.mdlaa.history import RingHistory
+from cosim.dnp3.lfc.mdlaa.shm_channel import ShmChannel, LocalChannel, MSG_DATA, MSG_NEW_DATA, MSG_SETUP, MSG_SKIP, MSG_STOP
+from cosim.dnp3.lfc.mdlaa.osqp_proc import osqp_process, OSQPPoolChannel
+from cosim.dnp3.lfc.mdlaa.qp_backends import QP_BACKENDS
+from cosim.dnp3.lfc.mdlaa.master1_proc import master1_process
+from cosim.dnp3.lfc.mdlaa.master2_proc import master2_process
+
+
+np.random.seed(2137)
+log = getLogger(__name__, "logs/MDLAA.log", level=logging.INFO)
+MAX_DISCONNECTION_TIME = 5 # sec
+EXECUTORS = ("threads", "solver-pool", "procs")
+
+
+class AttackStageTimes:
+    """
+        Stage timing hook of the MDLAAHandler. Keeps the number of calls, the total and the max duration of each stage.
+    """
+    def __init__(self):
+        self._stats = {}
+    
+    def __call__(self, stage: str, duration_ns: int):
+        count, total, longest = self._stats.get(stage, (0, 0, 0))
+        self._stats[stage] = (count + 1, total + duration_ns, max(longest, duration_ns))
+    
+    def log_summary(self):
+        for stage, (count, total, longest) in self._stats.items():
+            log.info(f"Stage {stage}: avg {total / count * MICRO:.3f} ms, max {longest * MICRO:.3f} ms "
+                     f"over {count} attacks (step time {step_time} ms)")
+
+        
+class MDLAAHandler:
+    def __init__(self, main_to_master1: ShmChannel, main_to_master2: ShmChannel, main_to_osqp: ShmChannel,
+                 osqp_to_main: ShmChannel, pow_sys_consts:dict, online_data_refresh=False, stage_timing_hook=None,
+                 pipelined=False, data_path=None, params=MDLAA_PARAMS, trace_dir=None):
+        # Channels
+        self._main_to_master1 = main_to_master1
+        self._main_to_master2 = main_to_master2
+        self._master_to_osqp = main_to_osqp
+        self._osqp_to_master = osqp_to_main
+        
+        # System dependent constants
+        self._NUM_GENS = pow_sys_consts['NUM_GENS']
+        self._NUM_LOADS = pow_sys_consts['NUM_LOADS']
+        self._NUM_LOADS_MASTER1 = pow_sys_consts['NUM_LOADS_MASTER1']
+        self._NUM_ATTACKED_LOADS = pow_sys_consts['NUM_ATTACKED_LOADS']
+        self._NOMINAL_PS = pow_sys_consts['NOMINAL_PS']
+        self._Ta = pow_sys_consts['Ta']
+        self._wait_iters = pow_sys_consts['wait_iters']
+        self._max_attack = pow_sys_consts['max_attack']
+        self._min_attack = pow_sys_consts['min_attack']
+        
+        # DeePC parameters
+        self._Tini = Tini = params['Tini']
+        self._Nap = params['Nap']
+        self._Nac = Nac = params['Nac']
+        self._Omega_r_weight = params['Omega_r_weight']
+        self._MAX_ATTACK_ITER = self._Ta / Nac
+        
+        # Measurement phase variables and constants
+        self._RND_ATTACK = params['rnd_attack_ampl']    # pu of load
+        self._SIN_AMPL_GAIN = params['sin_attack_gain'] # pu of load
+        self._SIN_FREQ = params['sin_attack_freq']      # rad/ms
+        self._STEP_TIME = params['step_time']           # ms
+        
+        self._sin_ampl = params['sin_attack_init_ampl'] # pu of load
+        self._sin_angles = np.random.uniform(0, 2*np.pi, self._NUM_ATTACKED_LOADS) # rad
+        
+        # Counters
+        self._measurement_iter = self._wait_iters
+        self._ka = Tini
+        self._attack_to_apply = -1
+        
+        # MDLAA freq and attack storage
+        self._curr_freqs = np.ones(self._NUM_GENS)
+        self._curr_attack = np.ones(self._NUM_ATTACKED_LOADS) # Used also to apply the attack through the second master station
+        
+        # Attack application pipeline, each stage updates _curr_attack in place or sends it.
+        # The hook, if given, is called as hook(stage_name, duration_ns) after each stage.
+        self._attack_stages = (("clip", self._correct_attacks_beyond_bounds),
+                               ("stats", self._update_and_log_all_time_max_min_attacks),
+                               ("send", self._send_attack_to_outstation))
+        self._stage_timing_hook = stage_timing_hook
+        
+        # Binary traces of the measured frequencies (Hz) and the applied attacks (pu), one record per frame/attack
+        self._num_frames = 0
+        self._freq_trace = self._attack_trace = None
+        if trace_dir is not None:
+            self._freq_trace = TraceWriter(os.path.join(trace_dir, "MDLAA_freqs.trace"),
+                                           [f"gen{i+1}" for i in range(self._NUM_GENS)])
+            self._attack_trace = TraceWriter(os.path.join(trace_dir, "MDLAA_attacks.trace"),
+                                             [f"load{i+1}" for i in range(self._NUM_ATTACKED_LOADS)])
+            self._attack_stages += (("trace", self._trace_attack),)
+    
+        # History of max and min attacks
+        self._all_max_attack = np.ones(self._NUM_ATTACKED_LOADS)
+        self._all_min_attack = np.ones(self._NUM_ATTACKED_LOADS)
+    
+        # Data storage for historical attacks and frequencies
+        self._U = np.empty([self._NUM_ATTACKED_LOADS, self._Ta])
+        self._Y = np.zeros([self._NUM_GENS, self._Ta]) # the last column is only measured in the online mode
+        self._attack_history = RingHistory(self._NUM_ATTACKED_LOADS, Tini) # Stores Tini past attacks
+        self._freq_history = RingHistory(self._NUM_GENS, Tini)             # Stores Tini past frequencies 
+        # Receives the solver results: Nac attacks to apply, then the frequencies they are predicted to cause
+        self._plan = np.empty([self._NUM_ATTACKED_LOADS + self._NUM_GENS, Nac])
+        self._optimal_attacks_to_apply = self._plan[:self._NUM_ATTACKED_LOADS]
+        self._predicted_freqs = self._plan[self._NUM_ATTACKED_LOADS:]
+        
+        # Pipelined mode: the next plan is solved from the predicted u_ini/y_ini while the current one is applied
+        assert not pipelined or Nac <= Tini, "Pipelined mode needs the control horizon within the initialization window"
+        self._pipelined = pipelined
+        self._is_solve_pending = False
+        self._predicted_ini = np.empty((self._NUM_ATTACKED_LOADS + self._NUM_GENS) * Tini)
+        
+        self._data_path = data_path # where to save the measured U and Y, if given
+        
+        # Online mode: (u, y) samples of every step of the attack, rolled into the solver data before each solve.
+        # They continue the measured U and Y, up to Nac + 1 steps (a plan and the step solving it) between solves.
+        self._online_data_refresh = online_data_refresh
+        self._new_U = np.empty([self._NUM_ATTACKED_LOADS, Nac + 1])
+        self._new_Y = np.empty([self._NUM_GENS, Nac + 1])
+        self._num_new_samples = 0
+        
+        self._watchdog_entry = Watchdog.get().register(self.__class__.__name__, MAX_DISCONNECTION_TIME,
+                                                       self._warn_when_no_measurements)
+        
+    
+    def process_data(self, incoming_data):
+        if incoming_data is None:
+            return
+        self._watchdog_entry.feed()
+        self._num_frames += 1
+        
+        self._read_frequencies(incoming_data)
+        if self._is_MDLAA_successful():
+            return 
+        
+        # MDLAA first phase - collect data
+        if self._measurement_iter < self._Ta:
+            self._execute_MDLAA_first_phase()
+            return
+        
+        self._update_freq_history()
+        if self._online_data_refresh:
+            self._collect_new_sample()
+        
+        # MDLAA second phase - predict attacks
+        if self._attack_to_apply == -1:
+            self._execute_MDLAA_second_phase()
+            return
+            
+        # MDLAA third phase - apply attacks
+        self._execute_MDLAA_third_phase()
+
+    
+    def _read_frequencies(self, incoming_data):
+        # incoming_data is the whole analog vector of the master1 point table
+        np.multiply(incoming_data[:self._NUM_GENS], MILLI, out=self._curr_freqs)
+        if self._freq_trace is not None:
+            self._freq_trace.append(self._num_frames, self._curr_freqs)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(f"Freqs: {['{0:.5f}'.format(i) for i in self._curr_freqs.tolist()]}")
+        self._curr_freqs /= NOMINAL_FREQ
+    
+    def _is_MDLAA_successful(self):   
+        if np.any(self._curr_freqs >= self._Omega_r_weight):
+            log.warning(f"MDLAA SUCCESSFUL: {self._curr_freqs * NOMINAL_FREQ}")
+            return True
+        return False
+    
+        
+    # ---First phase---
+    def _execute_MDLAA_first_phase(self):
+        log.info(f"Iter: {self._measurement_iter}")
+        if self._measurement_iter >= 0:
+            self._generate_and_apply_random_attack()
+            self._collect_measurements()
+        self._measurement_iter += 1           
+    
+    def _generate_and_apply_random_attack(self):
+        # Sinus attack for DLAA like behaviour, random attack to make Hankel matrix full rank by avoiding repetitions
+        rnd_attack = np.random.uniform(-self._RND_ATTACK, self._RND_ATTACK, self._NUM_ATTACKED_LOADS)
+        np.sin(self._sin_angles, out=self._curr_attack)
+        self._curr_attack *= self._sin_ampl
+        self._curr_attack += rnd_attack
+        self._curr_attack += 1 # Add to 1 because attack is added to nominal load
+        
+        self._sin_angles += self._SIN_FREQ * self._STEP_TIME
+        self._sin_ampl += self._SIN_AMPL_GAIN
+        self._do_attack()
+    
+    def _collect_measurements(self):
+        # Freqs delayed by one step and attacks ended one step faster,
+        # because the attack at t affects the frequency at t+1
+        is_debug = log.isEnabledFor(logging.DEBUG)
+        if self._measurement_iter < self._Ta:
+            self._U[:, self._measurement_iter] = self._curr_attack
+            if is_debug:
+                log.debug(f"Attack loads pu: {self._curr_attack.tolist()}")
+                log.debug(f"Loads: {['{0:.4f}'.format(i) for i in (self._curr_attack * self._NOMINAL_PS).tolist()]}")    
+        if self._measurement_iter > 0:
+            self._Y[:, self._measurement_iter-1] = self._curr_freqs
+            if is_debug:
+                log.debug(f"Freqs: {['{0:.5f}'.format(i) for i in (self._curr_freqs * NOMINAL_FREQ).tolist()]}")  
+     
+    
+    # ---Second phase---
+    def _execute_MDLAA_second_phase(self):
+        self._exit_if_max_attack_reached()
+        log.info(f"Attack starts from index: {self._ka}")
+        
+        if self._is_solve_pending:
+            # Pipelined mode: requested when the current plan started, usually solved by now
+            self._is_solve_pending = False
+        else:
+            if self._ka == self._Tini:
+                if self._online_data_refresh:
+                    # The frequencies caused by the last measured attack, the first phase ends before they come.
+                    # The online samples continue the data from them.
+                    self._Y[:, -1] = self._curr_freqs
+                self._master_to_osqp.put(MSG_SETUP, self._U, self._Y)
+                if self._data_path is not None:
+                    np.savez(self._data_path, U=self._U, Y=self._Y)
+                    log.info(f"Measured U and Y saved into {self._data_path}")
+                self._attack_history.fill(self._U[:, :self._Tini])
+                self._freq_history.fill(self._Y[:, :self._Tini])
+            self._send_new_samples_to_osqp()
+            # u_ini and y_ini, column-wise flattened as the solver expects them
+            self._master_to_osqp.put(MSG_DATA, self._attack_history.flat, self._freq_history.flat)
+        result_kind, _ = self._osqp_to_master.get(out=self._plan)
+        self._ka += self._Nac
+
+        # If problem infeasible, apply Nac random attacks then skip
+        if result_kind == MSG_SKIP:
+            for i in range(self._Nac):
+                self._generate_and_apply_random_attack()
+                self._update_attack_history()
+            self._stop_online_data_refresh()
+            return
+        
+        # Prepare for the attacks execution
+        self._attack_to_apply = 0   
+        if self._pipelined:
+            self._request_next_plan()
+            # No idle step at the boundary, the plan starts right away
+            self._execute_MDLAA_third_phase()
+    
+    def _request_next_plan(self):
+        # Histories as they will be once the plan is applied, from the planned attacks and the predicted frequencies
+        u_ini_end = self._NUM_ATTACKED_LOADS * self._Tini
+        self._attack_history.flat_after(self._optimal_attacks_to_apply, out=self._predicted_ini[:u_ini_end])
+        self._freq_history.flat_after(self._predicted_freqs, out=self._predicted_ini[u_ini_end:])
+        self._send_new_samples_to_osqp()
+        self._master_to_osqp.put(MSG_DATA, self._predicted_ini)
+        self._is_solve_pending = True
+    
+    
+    # ---Third phase---
+    def _execute_MDLAA_third_phase(self):
+        self._apply_predicted_attack()
+        self._update_attack_history()
+        if self._attack_to_apply == self._Nac-1:
+            self._attack_to_apply = -1
+        else:
+            self._attack_to_apply += 1
+    
+    def _apply_predicted_attack(self):
+        self._curr_attack[:] = self._optimal_attacks_to_apply[:, self._attack_to_apply]
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(f"Success, attack: {(self._curr_attack * self._NOMINAL_PS).tolist()}")
+        self._do_attack()
+
+
+    # ---Online data refresh---
+    def _collect_new_sample(self):
+        # Same convention as in the first phase: the attack at t paired with the frequency at t+1. The attack in effect
+        # over the last step, held on the steps solving the next plan too, is still in _curr_attack.
+        # The first step after the first phase completes the measured U and Y instead.
+        if self._ka == self._Tini:
+            return
+        self._new_U[:, self._num_new_samples] = self._curr_attack
+        self._new_Y[:, self._num_new_samples] = self._curr_freqs
+        self._num_new_samples += 1
+    
+    def _stop_online_data_refresh(self):
+        # The random attacks of a skipped plan are applied at once, their effects cannot be told apart. The samples
+        # after them would not continue the solver data, and a Hankel column across the gap is no trajectory.
+        if self._online_data_refresh:
+            self._online_data_refresh = False
+            log.warning("Online data refresh stopped after a skipped plan, the solver keeps its current data")
+    
+    def _send_new_samples_to_osqp(self):
+        if self._num_new_samples == 0:
+            return
+        self._master_to_osqp.put(MSG_NEW_DATA, self._new_U[:, :self._num_new_samples],
+                                 self._new_Y[:, :self._num_new_samples])
+        log.info(f"Sent {self._num_new_samples} new samples to the solver")
+        self._num_new_samples = 0
+
+
+    # ---Attack handling---
+    def _do_attack(self):
+        if self._stage_timing_hook is None:
+            for _, stage in self._attack_stages:
+                stage()
+            return
+        for stage_name, stage in self._attack_stages:
+            stage_start_time = time.perf_counter_ns()
+            stage()
+            self._stage_timing_hook(stage_name, time.perf_counter_ns() - stage_start_time)
+    
+    def _correct_attacks_beyond_bounds(self):
+        if log.isEnabledFor(logging.DEBUG):
+            above = np.flatnonzero(self._curr_attack > self._max_attack)
+            below = np.flatnonzero(self._curr_attack < self._min_attack)
+            if above.shape[0] > 0:
+                log.debug(f"Attacks {above.tolist()} are above the max_attack: {self._curr_attack[above].tolist()}")
+            if below.shape[0] > 0:
+                log.debug(f"Attacks {below.tolist()} are below the min_attack: {self._curr_attack[below].tolist()}")
+        np.clip(self._curr_attack, self._min_attack, self._max_attack, out=self._curr_attack)
+
+    def _trace_attack(self):
+        self._attack_trace.append(self._num_frames, self._curr_attack)
+
+    def _send_attack_to_outstation(self):
+        self._main_to_master1.put(MSG_DATA, self._curr_attack[:self._NUM_LOADS_MASTER1])
+        self._main_to_master2.put(MSG_DATA, self._curr_attack)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(f"Doing DLAA: {self._curr_attack.tolist()}")
+
+
+    # ---History updates ---
+    def _update_freq_history(self):
+        self._freq_history.push(self._curr_freqs)
+    
+    def _update_attack_history(self):
+        self._attack_history.push(self._curr_attack)
+
+
+    # ---Failure handling---    
+    def _exit_if_max_attack_reached(self):
+        if self._ka > self._Ta - self._Nap:
+            log.error("MDLAA exceeded max attack iterations. Stopping...")
+            self._main_to_master1.put(MSG_STOP)
+            self._main_to_master2.put(MSG_STOP)
+            self._master_to_osqp.put(MSG_STOP)
+            exit(0)
+
+
+    def close(self):
+        """Stops the watchdog of the handler, e.g. between offline replays in one process, and closes the traces"""
+        self._watchdog_entry.cancel()
+        for trace in (self._freq_trace, self._attack_trace):
+            if trace is not None:
+                trace.close()
+
+
+    def _warn_when_no_measurements(self):
+        log.warning(f"No measurements received for {MAX_DISCONNECTION_TIME} sec.")
+
+
+    # ---Logging---    
+    def _update_and_log_all_time_max_min_attacks(self):
+        np.maximum(self._all_max_attack, self._curr_attack, out=self._all_max_attack)
+        np.minimum(self._all_min_attack, self._curr_attack, out=self._all_min_attack)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(f"Max attacks: {(self._all_max_attack * self._NOMINAL_PS).tolist()}")
+            log.debug(f"Min attacks: {(self._all_min_attack * self._NOMINAL_PS).tolist()}")  
+    
+
+def get_latest_frame(channel: ShmChannel, out: np.ndarray):
+    """
+        Receives the next frame and skips to the newest one if more have piled up meanwhile.
+        Returns (kind, number of stale frames dropped). The stop message is never dropped.
+    """
+    kind, _ = channel.get(out=out)
+    num_dropped = 0
+    while kind != MSG_STOP:
+        try:
+            kind, _ = channel.get(out=out, timeout=0)
+        except queue.Empty:
+            break
+        num_dropped += 1
+    return kind, num_dropped
+
+
+def main(pow_sys_consts, executor="procs", online_data_refresh=False, time_attack_stages=False, pipelined=False,
+         qp_backend="osqp", data_path=None, setup_cache_dir=None, params=MDLAA_PARAMS, trace_dir="logs"):
+    """
+        Runs the MDLAA handler in the main thread, with the two master stations and the solver laid out by the executor:
+            threads     - masters and solver as threads of this process, channels in private memory
+            solver-pool - masters as threads, solver in a single-worker ProcessPoolExecutor
+            procs       - masters and solver as separate processes, channels in shared memory
+        In the pipelined mode the frames that piled up while the handler was busy are dropped and counted.
+    """
+    assert executor in EXECUTORS, f"Unknown executor {executor}, use one of {EXECUTORS}"
+    NUM_GENS = pow_sys_consts['NUM_GENS']
+    NUM_ATTACKED_LOADS = pow_sys_consts['NUM_ATTACKED_LOADS']
+    Channel = ShmChannel if executor == "procs" else LocalChannel
+    Worker = Process if executor == "procs" else partial(threading.Thread, daemon=True)
+    
+    master1_to_main = Channel(NUM_GENS, num_slots=64)
+    main_to_master1 = Channel(pow_sys_consts['NUM_LOADS_MASTER1'])
+    main_to_master2 = Channel(NUM_ATTACKED_LOADS)
+    if executor == "solver-pool":
+        master_to_osqp = osqp_to_master = OSQPPoolChannel(pow_sys_consts, qp_backend, setup_cache_dir, params, trace_dir)
+        channels = [master_to_osqp, master1_to_main, main_to_master1, main_to_master2]
+    else:
+        master_to_osqp = Channel((NUM_ATTACKED_LOADS + NUM_GENS) * pow_sys_consts['Ta'], num_slots=2)
+        osqp_to_master = Channel((NUM_ATTACKED_LOADS + NUM_GENS) * params['Nac'], num_slots=2)
+        channels = [master_to_osqp, osqp_to_master, master1_to_main, main_to_master1, main_to_master2]
+    
+    workers = [Worker(target=master1_process, args=(main_to_master1, master1_to_main, params['step_time'], pow_sys_consts)),
+               Worker(target=master2_process, args=(main_to_master2, params['step_time'], pow_sys_consts))]
+    if executor != "solver-pool":
+        workers.append(Worker(target=osqp_process, args=(master_to_osqp, osqp_to_master, pow_sys_consts, qp_backend,
+                                               setup_cache_dir, params, trace_dir)))
+    for worker in workers:
+        worker.start()
+    log.info(f"Workers started, executor: {executor}")
+    
+    stage_times = AttackStageTimes() if time_attack_stages else None
+    mdlaa_handler = MDLAAHandler(main_to_master1=main_to_master1, main_to_master2=main_to_master2,
+                                 main_to_osqp=master_to_osqp, osqp_to_main=osqp_to_master,
+                                 pow_sys_consts=pow_sys_consts, online_data_refresh=online_data_refresh,
+                                 stage_timing_hook=stage_times, pipelined=pipelined, data_path=data_path,
+                                 params=params, trace_dir=trace_dir)
+    
+    freqs = np.empty(NUM_GENS)
+    num_dropped_frames = 0
+    try:
+        while True:
+            if pipelined:
+                kind, num_dropped = get_latest_frame(master1_to_main, freqs)
+                if num_dropped > 0:
+                    num_dropped_frames += num_dropped
+                    log.warning(f"Dropped {num_dropped} stale frames, {num_dropped_frames} in total")
+            else:
+                kind, _ = master1_to_main.get(out=freqs)
+            if kind == MSG_STOP:
+                break
+            mdlaa_handler.process_data(freqs)
+    finally:
+        # The handler exits through here as well, after sending the stop messages
+        if stage_times is not None:
+            stage_times.log_summary()
+        if pipelined:
+            log.info(f"Stale frames dropped: {num_dropped_frames}")
+        mdlaa_handler.close()
+        for worker in workers:
+            worker.join(timeout=MAX_DISCONNECTION_TIME)
+        for channel in channels:
+            channel.close()
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pow_sys", choices=["39bus", "kundur"],
+                        help="Power system under attack.")
+    parser.add_argument("-e", "--executor", required=False, default="procs", choices=EXECUTORS,
+                        help="Layout of the master stations and the solver.")
+    parser.add_argument("--online", required=False, action="store_true",
+                        help="Roll the samples measured during the attack into the solver data.")
+    parser.add_argument("-b", "--qp-backend", required=False, default="osqp", choices=list(QP_BACKENDS),
+                        help="QP backend of the solver.")
+    parser.add_argument("--save-data", required=False, metavar="PATH",
+                        help="Save the measured U and Y into an .npz file, e.g. for benchmark_qp_backends.")
+    parser.add_argument("--setup-cache", required=False, metavar="DIR",
+                        help="Cache the prepared solver matrices in DIR, reused by runs with the same U and Y.")
+    parser.add_argument("--pipelined", required=False, action="store_true",
+                        help="Solve the next plan while the current one is applied, drop stale frames.")
+    parser.add_argument("--trace-dir", required=False, default="logs",
+                        help="Directory of the binary frequency and attack traces, logs by default.")
+    parser.add_argument("--no-trace", required=False, action="store_true",
+                        help="Do not write the traces.")
+    parser.add_argument("--timing", required=False, action="store_true",
+                        help="Time the attack application stages.")
+    return parser.parse_args()
+           
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    pow_sys_consts = consts_39BUS if args.pow_sys == "39bus" else consts_KUNDUR
+    main(pow_sys_consts, executor=args.executor, online_data_refresh=args.online, time_attack_stages=args.timing,
+         pipelined=args.pipelined, qp_backend=args.qp_backend, data_path=args.save_data,
+         setup_cache_dir=args.setup_cache, trace_dir=None if args.no_trace else args.trace_dir)
@@ -0,0 +1,68 @@
+import argparse
+import time
+
+import numpy as np
+
+from cosim.dnp3.lfc.mdlaa.constants import MICRO, MDLAA_PARAMS, consts_39BUS, consts_KUNDUR
+from cosim.dnp3.lfc.mdlaa.osqp_proc import OSQPSolver
+from cosim.dnp3.lfc.mdlaa.qp_backends import QP_BACKENDS
+from cosim.mylogging import configure_levels
+
+
+def benchmark(U, Y, pow_sys_consts, num_solves, seed=0, params=MDLAA_PARAMS):
+    """
+        Solves the same [u_ini; y_ini] requests, windows of the recorded data at random offsets,
+        with every QP backend. Returns the solve times (ms) and the results of each backend.
+    """
+    Tini = params['Tini']
+    offsets = np.random.default_rng(seed).integers(0, U.shape[1] - Tini + 1, num_solves)
+    inis = [np.hstack([U[:, t:t + Tini].flatten(order='F'), Y[:, t:t + Tini].flatten(order='F')]) for t in offsets]
+
+    times, results, solvers = {}, {}, {}
+    for name in QP_BACKENDS:
+        solver = OSQPSolver(pow_sys_consts, name, params=params)
+        solver.prepare_OSQP_parameters(U, Y)
+        solver.construct_constraints()
+        solver.setup_solve()
+        times[name], results[name] = [], []
+        for ini in inis:
+            start_time = time.perf_counter_ns()
+            results[name].append(solver.update_solve(ini))
+            times[name].append((time.perf_counter_ns() - start_time) * MICRO)
+        solvers[name] = solver
+    return times, results, solvers
+
+
+def report(times, results, solvers):
+    for name, solve_times in times.items():
+        p50, p95 = np.percentile(solve_times, [50, 95])
+        num_skips = sum('skip' in result for result in results[name])
+        print(f"{name:>6}: p50 {p50:8.3f} ms, p95 {p95:8.3f} ms, max {max(solve_times):8.3f} ms, skipped {num_skips}")
+
+    backend = solvers["kkt"]._backend
+    print(f"kkt: {backend.num_kkt_solves} solved from the KKT factorization, {backend.num_fallbacks} fell back to OSQP")
+
+    # Max deviation of the kkt results from the osqp ones, over the requests both solved
+    both_solved = [(osqp, kkt) for osqp, kkt in zip(results["osqp"], results["kkt"]) if 'skip' not in osqp and 'skip' not in kkt]
+    for key in ('attacks', 'pred_freqs'):
+        max_diff = max((np.max(np.abs(osqp[key] - kkt[key])) for osqp, kkt in both_solved), default=float('nan'))
+        print(f"max |kkt - osqp| of {key}: {max_diff:.3e}")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Compares the latency and the results of the QP backends "
+                                                 "of the MDLAA solver on recorded data.")
+    parser.add_argument("data", help="An .npz file with the U and Y arrays, e.g. saved with MDLAA_ctrl --save-data.")
+    parser.add_argument("pow_sys", choices=["39bus", "kundur"], help="Power system of the recorded data.")
+    parser.add_argument("-n", "--num-solves", type=int, default=200, help="Number of solve requests per backend.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    # The solver logs every solve, which would dominate the measured times
+    configure_levels({"cosim.dnp3.lfc.mdlaa": "WARNING"})
+
+    data = np.load(args.data)
+    pow_sys_consts = consts_39BUS if args.pow_sys == "39bus" else consts_KUNDUR
+    report(*benchmark(data['U'], data['Y'], pow_sys_consts, args.num_solves))
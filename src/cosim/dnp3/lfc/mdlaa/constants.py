@@ -95,4 +95,25 @@ consts_KUNDUR = {
     'wait_iters': wait_iters_KUNDUR,
     'max_attack': max_attack_KUNDUR,
     'min_attack': min_attack_KUNDUR
-}
\ No newline at end of file
+}
+
+
+####################################
+# MDLAA PARAMETERS DICTIONARY
+####################################
+
+# Defaults of the DeePC and measurement phase parameters. The MDLAA handler and the solver take them
+# as a `params` dictionary, so runs with different parameters can share one process, e.g. in a sweep.
+MDLAA_PARAMS = {
+    'Tini': Tini,
+    'Nap': Nap,
+    'Nac': Nac,
+    'Omega_r_weight': Omega_r_weight,
+    'Q_weight': Q_weight,
+    'R_weight': R_weight,
+    'rnd_attack_ampl': rnd_attack_ampl,
+    'sin_attack_init_ampl': sin_attack_init_ampl,
+    'sin_attack_gain': sin_attack_gain,
+    'sin_attack_freq': sin_attack_freq,
+    'step_time': step_time
+}
@@ -0,0 +1,49 @@
+import numpy as np
+
+
+class RingHistory:
+    """
+        Fixed-length history of the last `length` samples (columns) of `rows` signals, as a circular buffer.
+
+        The samples are stored one per row and each of them is written twice, `length` rows apart, so the
+        last `length` samples always form one contiguous block. Flattened, the block is the column-wise
+        (Fortran order) flattening of the [rows, length] history matrix, i.e. u_ini / y_ini of the solver,
+        without any copy. Pushing a sample costs two row writes and no allocation.
+    """
+    def __init__(self, rows: int, length: int, fill_value=1.0):
+        self._length = length
+        self._samples = np.full((2 * length, rows), fill_value, dtype=np.float64)
+        self._oldest = 0
+
+    def push(self, sample: np.ndarray):
+        """Replaces the oldest sample with the new one"""
+        self._samples[self._oldest] = sample
+        self._samples[self._oldest + self._length] = sample
+        self._oldest = (self._oldest + 1) % self._length
+
+    def fill(self, history: np.ndarray):
+        """Overwrites the whole history with a [rows, length] matrix, oldest sample first"""
+        self._samples[:self._length] = history.T
+        self._samples[self._length:] = history.T
+        self._oldest = 0
+
+    @property
+    def flat(self) -> np.ndarray:
+        """Zero-copy, column-wise flattened history, oldest sample first. Valid until the next push."""
+        return self._samples[self._oldest:self._oldest + self._length].reshape(-1)
+
+    def flat_after(self, future: np.ndarray, out: np.ndarray) -> np.ndarray:
+        """
+            Writes into `out` the flattened history as it would be after pushing the [rows, k] future samples, k <= length.
+            The history itself does not change.
+        """
+        num_future = future.shape[1]
+        samples = out.reshape(self._length, -1)
+        samples[:self._length - num_future] = self._samples[self._oldest + num_future:self._oldest + self._length]
+        samples[self._length - num_future:] = future.T
+        return out
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Zero-copy [rows, length] view of the history, oldest sample first. Valid until the next push."""
+        return self._samples[self._oldest:self._oldest + self._length].T
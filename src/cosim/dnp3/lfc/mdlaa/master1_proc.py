@@ -1,37 +1,52 @@
 import logging
-
-from multiprocessing import Queue
+import queue
+import numpy as np
 
 from pydnp3.opendnp3 import GroupVariation
 
 from cosim.dnp3.master import MasterStation
 from cosim.dnp3.soe_handler import SOEHandlerAdjusted
+from cosim.dnp3.lfc.mdlaa.shm_channel import ShmChannel, MSG_DATA, MSG_STOP
+
+
+DROPPED_FRAMES_REPORT_INTERVAL = 100 # frames
 
 
 class SOEHandlerMaster1(SOEHandlerAdjusted):
-    def __init__(self, station_ref, master1_to_main:Queue, log_file_path="logs/d_r_lfc_mdlaa.log", soehandler_log_level=logging.INFO, *args, **kwargs):
+    def __init__(self, station_ref, master1_to_main:ShmChannel, log_file_path="logs/d_r_lfc_mdlaa.log", soehandler_log_level=logging.INFO, *args, **kwargs):
         super().__init__(log_file_path, soehandler_log_level, station_ref, *args, **kwargs)
         self.master1_to_main = master1_to_main
+        self.num_dropped_frames = 0
         
     
     def _process_incoming_data(self, info_gv, visitor_index_and_value):
         if info_gv in [GroupVariation.Group30Var6]:
-            self.master1_to_main.put(visitor_index_and_value)
+            # Never blocks the DNP3 thread: while the main process is busy (setup, slow solve) and the ring is full,
+            # the new frames are dropped, the main process only takes the latest frame anyway
+            try:
+                self.master1_to_main.put(MSG_DATA, self.point_table(info_gv).values[:self.master1_to_main.slot_size],
+                                         timeout=0)
+            except queue.Full:
+                self.num_dropped_frames += 1
+                if self.num_dropped_frames % DROPPED_FRAMES_REPORT_INTERVAL == 1:
+                    self.logger.warning(f"Frame dropped, the channel to the main process is full, "
+                                        f"{self.num_dropped_frames} dropped in total")
         
 
-def master1_process(main_to_master1: Queue, master1_to_main: Queue, step_time):
+def master1_process(main_to_master1: ShmChannel, master1_to_main: ShmChannel, step_time, pow_sys_consts):
     outstation_ip = "172.24.14.212"
     port = 20001
 
     master1 = MasterStation(outstation_ip=outstation_ip, port=port, master_id=1, outstation_id=2, log_handler=None)
-    soe_handler = SOEHandlerMaster1(station_ref=master1, master1_to_main=master1_to_main)
+    soe_handler = SOEHandlerMaster1(station_ref=master1, master1_to_main=master1_to_main, fast_path=True)
     master1.configure_master(soe_handler, outstation_ip, port, scan_time=step_time)
     master1.start()
 
+    loads = np.empty(pow_sys_consts['NUM_LOADS_MASTER1'])
     while True:
-        data = main_to_master1.get()
-        if type(data) == int and data == -1:
-            master1_to_main.put(-1)
+        kind, _ = main_to_master1.get(out=loads)
+        if kind == MSG_STOP:
+            master1_to_main.put(MSG_STOP)
             exit(0)
             
-        master1.send_direct_point_command(data[0], data[1], data[2], data[3])
+        master1.send_direct_point_commands(40, 4, dict(enumerate(loads.tolist())))
@@ -1,12 +1,11 @@
 import numpy as np
 import logging
 
-from multiprocessing import Queue
-
 from pydnp3.opendnp3 import GroupVariation
 
 from cosim.dnp3.master import MasterStation
 from cosim.dnp3.soe_handler import SOEHandlerAdjusted
+from cosim.dnp3.lfc.mdlaa.shm_channel import ShmChannel, MSG_STOP
 
 
 # Secondary master station applying the calculated attacks to second set of loads
@@ -33,12 +32,11 @@ class MDLAAHandlerSecondary(SOEHandlerAdjusted):
     
     def _do_attack(self):
         loads = self._curr_attack[self._NUM_ATTACKED_LOADS - self._NUM_LOADS_MASTER2:]
-        for i in range(self._NUM_LOADS_MASTER2):
-            self.station_ref.send_direct_point_command(40, 4, i, float(loads[i]))
+        self.station_ref.send_direct_point_commands(40, 4, dict(enumerate(loads.tolist())))
 
 
 
-def master2_process(main_to_master2:Queue, step_time, pow_sys_consts):
+def master2_process(main_to_master2:ShmChannel, step_time, pow_sys_consts):
     outstation_ip2 = "172.24.14.213"
     port2 = 20002
     
@@ -53,9 +51,7 @@ def master2_process(main_to_master2:Queue, step_time, pow_sys_consts):
     master2.start()
     
     while True:
-        data = main_to_master2.get()
-        if type(data) == int and data == -1:
-            exit(0)
-        
-        for i in range(len(data)):
-            loads_coeffs[i] = data[i]
\ No newline at end of file
+        # Written in place, as the SOE handler keeps a reference to loads_coeffs
+        kind, _ = main_to_master2.get(out=loads_coeffs)
+        if kind == MSG_STOP:
+            exit(0)
\ No newline at end of file
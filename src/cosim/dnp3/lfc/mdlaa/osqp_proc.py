@@ -1,81 +1,177 @@
+import os
 import time
+import queue
+import collections
 import numpy as np
-import logging
-import osqp
-import scipy.sparse
 
-from multiprocessing import Queue
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from numpy.lib.stride_tricks import sliding_window_view
 
 from cosim.mylogging import getLogger
-from cosim.dnp3.lfc.mdlaa.constants import Tini, Nap, Nac, Q_weight, R_weight, Omega_r_weight, MICRO
+from cosim.trace import TraceWriter
+from cosim.dnp3.lfc.mdlaa.constants import MICRO, MDLAA_PARAMS
+from cosim.dnp3.lfc.mdlaa.qp_backends import QP_BACKENDS
+from cosim.dnp3.lfc.mdlaa.setup_cache import SetupCache
+from cosim.dnp3.lfc.mdlaa.shm_channel import ShmChannel, MSG_DATA, MSG_NEW_DATA, MSG_SETUP, MSG_SKIP, MSG_STOP
 
 
 log = getLogger(__name__, "logs/osqp.log")
-freq_log = getLogger("PredFreqLog", "logs/freqs.log", formatter=logging.Formatter('%(message)s'))
 
 class OSQPSolver:
-    def __init__(self, pow_sys_consts):
+    def __init__(self, pow_sys_consts, qp_backend="osqp", setup_cache_dir=None, params=MDLAA_PARAMS, trace_dir=None):
         self._NUM_GENS = pow_sys_consts['NUM_GENS']
         self._NUM_ATTACKED_LOADS = pow_sys_consts['NUM_ATTACKED_LOADS']
         self._max_attack = pow_sys_consts['max_attack']
         self._min_attack = pow_sys_consts['min_attack']
         
-        self._osqp = osqp.OSQP()       
+        self._params = params
+        self._Tini = params['Tini']
+        self._Nap = params['Nap']
+        self._Nac = params['Nac']
+        
+        self._backend = QP_BACKENDS[qp_backend]()
+        self._setup_cache = SetupCache(setup_cache_dir) if setup_cache_dir is not None else None
+        self._cached = None             # arrays loaded from the setup cache, None on a miss
         self._osqp_parameters_prepared = False
         self._osqp_constraints_constructed = False
+        self._osqp_set_up = False
         
         self._num_of_osqp_solved = 0    # we won't count the first calculation
         self._avg_osqp_solving_time = 0.0
         self._last_solution = None      # store last solution for warm starting
+        
+        # Binary trace of the predicted frequencies (pu), Nac records per plan, the plan number as their step
+        self._num_plans = 0
+        self._pred_freqs_trace = None
+        if trace_dir is not None:
+            self._pred_freqs_trace = TraceWriter(os.path.join(trace_dir, "pred_freqs.trace"),
+                                                 [f"gen{i+1}" for i in range(self._NUM_GENS)])
     
         
+    def handle_message(self, kind, payload):
+        """
+        Serves one message of the MDLAA solver protocol, with U/Y, new samples or [u_ini; y_ini] as the flat payload.
+        Returns the result only for the MSG_DATA solve requests, None otherwise.
+        """
+        L, G = self._NUM_ATTACKED_LOADS, self._NUM_GENS
+        if kind == MSG_SETUP:
+            Ta = payload.shape[0] // (L + G)
+            self.prepare_OSQP_parameters(payload[:L * Ta].reshape(L, Ta), payload[L * Ta:].reshape(G, Ta))
+            self.construct_constraints()
+            self.setup_solve() # first solution only warm starts the first request
+            return None
+        if kind == MSG_NEW_DATA:
+            num_new = payload.shape[0] // (L + G)
+            self.update_data(payload[:L * num_new].reshape(L, num_new), payload[L * num_new:].reshape(G, num_new))
+            return None
+        return self.update_solve(payload)
+    
+    
     def prepare_OSQP_parameters(self, U, Y):
         log.info("Preparing OSQP parameters...")
-        self._attack_history = U[:, :Tini]
-        self._freq_history = Y[:, :Tini]
-        
-        HU = self._build_hankel(U, Tini + Nap) # shape: [(Tini+Nap)*num_load_buses, Ta-Tini-Nap+1]
-        HY = self._build_hankel(Y, Tini + Nap) # shape: [(Tini+Nap)*num_gen_buses, Ta-Tini-Nap+1]
-        self._assert_Hankel_full_rank(np.vstack([HU, HY]))
-
-        # Split into past/future blocks
-        self._Up = HU[:Tini*self._NUM_ATTACKED_LOADS, :]
-        self._Uf = HU[Tini*self._NUM_ATTACKED_LOADS:, :]
-        self._Yp = HY[:Tini*self._NUM_GENS, :]
-        self._Yf = HY[Tini*self._NUM_GENS:, :]
-        
-        self._Up_sparse = scipy.sparse.csc_matrix(self._Up)
-        self._Yp_sparse = scipy.sparse.csc_matrix(self._Yp)
-        self._Yf_sparse = scipy.sparse.csc_matrix(self._Yf)
-        self._Uf_sparse = scipy.sparse.csc_matrix(self._Uf)
-        
-        Q_sparse = Q_weight * scipy.sparse.eye(Nap * self._NUM_GENS, format='csc')
-        R_sparse = R_weight * scipy.sparse.eye(Nap * self._NUM_ATTACKED_LOADS, format='csc')
-        
-        Omega_r = Omega_r_weight * np.ones(Nap * self._NUM_GENS)
-        
-        # Construct OSQP parameters
-        YfTxQ = self._Yf_sparse.T @ Q_sparse
-        self._H = 2 * (YfTxQ @ self._Yf_sparse + 
-                    self._Uf_sparse.T @ R_sparse @ self._Uf_sparse)
-        self._H = self._H.tocsc()
-        self._f = -2 * (YfTxQ.toarray() @ Omega_r)
+        self._attack_history = U[:, :self._Tini]
+        self._freq_history = Y[:, :self._Tini]
+        # Own copies of the data window, rolled forward in the online mode
+        self._U_data = np.array(U, dtype=np.float64)
+        self._Y_data = np.array(Y, dtype=np.float64)
+        if self._setup_cache is not None:
+            self._cache_key = self._setup_cache.key(self._U_data, self._Y_data, self._params)
+            self._cached = self._setup_cache.load(self._cache_key)
+        self._build_data_matrices(check_rank=True, cached=self._cached)
         self._osqp_parameters_prepared = True
+    
+    
+    def _build_data_matrices(self, check_rank=False, cached=None):
+        Tini, Nap = self._Tini, self._Nap
+        HU = self._build_hankel(self._U_data, Tini + Nap) # shape: [Tini+Nap, num_load_buses, Ta-Tini-Nap+1], strided view of U
+        HY = self._build_hankel(self._Y_data, Tini + Nap) # shape: [Tini+Nap, num_gen_buses, Ta-Tini-Nap+1], strided view of Y
+        cols_num = HU.shape[2]
 
+        # Split into past/future blocks. Only the blocks entering the constraints are materialized.
+        self._Up = HU[:Tini].reshape(Tini * self._NUM_ATTACKED_LOADS, cols_num)
+        self._Uf = HU[Tini:].reshape(Nap * self._NUM_ATTACKED_LOADS, cols_num)
+        self._Yp = HY[:Tini].reshape(Tini * self._NUM_GENS, cols_num)
+        self._Yf_blocks = HY[Tini:]
+        
+        if cached is not None: # the same data already passed the rank check
+            self._H, self._f = cached['H'], cached['f']
+            return
+        
+        # Gram matrices of the Hankel blocks, straight from the data columns without building the Hankel matrices
+        U_diag_cumsum = self._diagonal_cumsum(self._U_data.T @ self._U_data)
+        Y_diag_cumsum = self._diagonal_cumsum(self._Y_data.T @ self._Y_data)
+        if check_rank:
+            self._assert_Hankel_full_rank(np.vstack([HU.reshape(-1, cols_num), HY.reshape(-1, cols_num)]))
+        
+        # Construct OSQP parameters, with Q = Q_weight * I and R = R_weight * I:
+        # H = 2 * (Yf^T Q Yf + Uf^T R Uf), dense as the Hankel blocks are dense
+        Q_weight, R_weight = self._params['Q_weight'], self._params['R_weight']
+        self._H = 2 * (Q_weight * self._hankel_gram(Y_diag_cumsum, Tini, Nap, cols_num) +
+                       R_weight * self._hankel_gram(U_diag_cumsum, Tini, Nap, cols_num))
+        # f = -2 * Yf^T Q Omega_r, Omega_r = Omega_r_weight * ones
+        Y_col_sums = self._Y_data.sum(axis=0)
+        self._f = -2 * Q_weight * self._params['Omega_r_weight'] * \
+            sliding_window_view(Y_col_sums[Tini:Tini + Nap + cols_num - 1], cols_num).sum(axis=0)
+
+    
+    def update_data(self, U_new, Y_new):
+        """
+        Online mode: rolls the new (u, y) samples into the data window, dropping the oldest ones,
+        and updates P, q and A of the already set up problem, so the QP backend only refactorizes
+        instead of being set up again. The samples have to continue the window step by step,
+        every Hankel column is taken for a trajectory of the system.
+        """
+        assert self._osqp_set_up, "OSQP problem not set up!"
+        num_new = U_new.shape[1]
+        self._U_data[:, :-num_new] = self._U_data[:, num_new:]
+        self._U_data[:, -num_new:] = U_new
+        self._Y_data[:, :-num_new] = self._Y_data[:, num_new:]
+        self._Y_data[:, -num_new:] = Y_new
+        
+        self._build_data_matrices()
+        self._A = self._stacked_constraint_matrix()
+        self._backend.update_problem(self._H, self._f, self._A)
+        log.info(f"Rolled {num_new} new samples into the OSQP data")
     
-    def _build_hankel(self, data, L):
-        cols_num = data.shape[1] - L + 1  
-        H = np.zeros((L * data.shape[0], cols_num))
-        for i in range(L):
-            row_block = data[:, i:i+cols_num]
-            H[i*data.shape[0]:(i+1)*data.shape[0], :] = row_block
-        return H
     
+    @staticmethod
+    def _build_hankel(data, L):
+        """Block Hankel matrix of data as a zero-copy strided view: H[i, :, c] = data[:, i + c]"""
+        cols_num = data.shape[1] - L + 1
+        return sliding_window_view(data, cols_num, axis=1).transpose(1, 0, 2)
     
-    def _assert_Hankel_full_rank(self, attacks_Hankel):
-        rank = np.linalg.matrix_rank(attacks_Hankel)
-        log.info(f"Rank of combined Hankel matrix: {rank} / {attacks_Hankel.shape[1]} columns")
-        assert rank == attacks_Hankel.shape[1], "Attack vectors Hankel matrix is not full rank"
+    
+    @staticmethod
+    def _diagonal_cumsum(K):
+        """
+        C[a + 1, b + 1] = K[a, b] + C[a, b], cumulative sums along the diagonals of K,
+        with a leading row and column of zeros, so that the sums of the first Hankel block need no special case
+        """
+        C = np.zeros((K.shape[0] + 1, K.shape[1] + 1))
+        C[1:, 1:] = K
+        for a in range(2, C.shape[0]):
+            C[a, 2:] += C[a-1, 1:-1]
+        return C
+    
+    
+    @staticmethod
+    def _hankel_gram(diag_cumsum, first_block, num_blocks, cols_num):
+        """
+        Sum of H_i^T H_i over the Hankel blocks first_block <= i < first_block + num_blocks,
+        where (H_i^T H_i)[c, d] = K[c + i, d + i] for K = data^T data.
+        """
+        end = first_block + num_blocks
+        gram = diag_cumsum[end:end + cols_num, end:end + cols_num].copy()
+        gram -= diag_cumsum[first_block:first_block + cols_num, first_block:first_block + cols_num]
+        return gram
+    
+    
+    def _assert_Hankel_full_rank(self, hankel):
+        # On the Hankel matrix itself, the Gram matrix squares its condition number and cannot tell the
+        # singular values below about sqrt(eps) of the largest one from zero
+        rank = np.linalg.matrix_rank(hankel)
+        log.info(f"Rank of combined Hankel matrix: {rank} / {hankel.shape[1]} columns")
+        assert rank == hankel.shape[1], "Attack vectors Hankel matrix is not full rank"
     
     
     def construct_constraints(self):
@@ -85,26 +181,28 @@ class OSQPSolver:
         self._y_ini = self._freq_history.flatten(order='F')    
             
         # [Up; Yp] * g = [u_ini; y_ini]
-        self._A_eq = scipy.sparse.vstack([self._Up_sparse, self._Yp_sparse])
         self._lb_eq = np.hstack([self._u_ini, self._y_ini])
         self._ub_eq = self._lb_eq 
         # min_attack <= Uf * g <= max_attack (repeated for N steps)
-        self._A_ineq = self._Uf_sparse
-        self._ub_ineq = np.tile(self._max_attack, Nap) # upper bound for controlled load
-        self._lb_ineq = np.tile(self._min_attack, Nap) # lower bound for controlled load
+        self._ub_ineq = np.tile(self._max_attack, self._Nap) # upper bound for controlled load
+        self._lb_ineq = np.tile(self._min_attack, self._Nap) # lower bound for controlled load
         # Combine constraints
-        self._A = scipy.sparse.vstack([self._A_eq, self._A_ineq])
-        self._A = self._A.tocsc()
+        self._A = self._stacked_constraint_matrix()
         self._lb = np.hstack([self._lb_eq, self._lb_ineq])
         self._ub = np.hstack([self._ub_eq, self._ub_ineq])
         self._assert_residuals_small_enough()
         self._osqp_constraints_constructed = True
     
     
+    def _stacked_constraint_matrix(self):
+        # [Up; Yp] for the equality constraints, Uf for the attack bounds
+        return np.vstack([self._Up, self._Yp, self._Uf])
+    
+    
     def _assert_residuals_small_enough(self):
         # Checking if [u_ini; y_ini] lies in the column space of [Up; Yp]
         # Solving least-squares: Find g such that A_eq * g ≈ target
-        A_eq_dense = self._A_eq.todense()
+        A_eq_dense = np.vstack([self._Up, self._Yp])
         g_ls = np.linalg.lstsq(A_eq_dense, self._lb_eq, rcond=None)[0]
         residual = np.linalg.norm(A_eq_dense @ g_ls - self._lb_eq)
         log.info(f"Least-squares residual: {residual}")
@@ -123,53 +221,59 @@ class OSQPSolver:
             'adaptive_rho_interval': 25
         }
         
-        self._osqp.setup(
-            P=self._H, q=self._f.flatten(),
-            A=self._A, l=self._lb, u=self._ub,
-            **settings)
+        self._backend.setup(self._H, self._f, self._A, self._lb, self._ub, num_eq=self._lb_eq.shape[0],
+                            cached_state=self._cached, **settings)
+        self._osqp_set_up = True
+        self._save_to_setup_cache()
         
         log.info("Solving OSQP problem...")
-        result = self._osqp.solve()
-        return self._return_attacks_or_skip_if_infeasible(result)
+        return self._return_attacks_or_skip_if_infeasible(*self._backend.solve(self._lb, self._ub))
        
    
-    def update_solve(self, attack_history, freq_history):
-        self._u_ini = attack_history.flatten(order='F')
-        self._y_ini = freq_history.flatten(order='F')
-        self._lb_eq = np.hstack([self._u_ini, self._y_ini])
-        self._ub_eq = self._lb_eq   
-        self._lb = np.hstack([self._lb_eq, self._lb_ineq])
-        self._ub = np.hstack([self._ub_eq, self._ub_ineq]) 
-        
-        self._osqp.update(l=self._lb, u=self._ub)
-        # Update problem with warm start
-        if self._last_solution is not None:
-            self._osqp.warm_start(x=self._last_solution)
+    def _save_to_setup_cache(self):
+        # Saved again only when the cached entry lacks the state of this backend
+        if self._setup_cache is None:
+            return
+        backend_state = self._backend.cache_state()
+        if self._cached is None or not backend_state.keys() <= self._cached.keys():
+            self._setup_cache.save(self._cache_key, {**(self._cached or {}), 'H': self._H, 'f': self._f, **backend_state})
+        self._cached = None # the online mode changes the data, nothing more to reuse
+   
+   
+    def update_solve(self, ini):
+        # ini = [u_ini; y_ini], the column-wise flattened attack and frequency histories.
+        # Only the equality part of the bounds changes, written in place.
+        self._lb[:ini.shape[0]] = ini
+        self._ub[:ini.shape[0]] = ini
         
         log.info("Solving OSQP problem...")
         osqp_solving_start_time = time.time_ns()
-        result = self._osqp.solve()
+        # Warm started from the last solution
+        status, solution = self._backend.solve(self._lb, self._ub, self._last_solution)
         self._log_osqp_solving_time(osqp_solving_start_time)
         
-        return self._return_attacks_or_skip_if_infeasible(result)
+        return self._return_attacks_or_skip_if_infeasible(status, solution)
     
     
-    def _return_attacks_or_skip_if_infeasible(self, result):
-        if result.info.status != 'solved':
-            log.warning(f"Optimization failed. Status: {result.info.status}. Skipping...")
+    def _return_attacks_or_skip_if_infeasible(self, status, solution):
+        if status != 'solved':
+            log.warning(f"Optimization failed. Status: {status}. Skipping...")
             self._last_solution = None
             return {'skip': True}
-        self._last_solution = result.x  # store last solution for warm starting
-        return {'attacks': self._extract_optimal_attacks(result.x)}
+        self._last_solution = solution  # store last solution for warm starting
+        return self._extract_optimal_attacks(solution)
     
     
     def _extract_optimal_attacks(self, g_optimal):
         log.info("OSQP Solved successfully")
-        pred_freqs = (self._Yf @ g_optimal).reshape(Nap, self._NUM_GENS).T
-        freq_log.info(f"{pred_freqs[:, :Nac]}")
-        u_opt = (self._Uf @ g_optimal).reshape(Nap, self._NUM_ATTACKED_LOADS).T
-        optimal_attacks_to_apply = u_opt[:, :Nac]
-        return optimal_attacks_to_apply
+        pred_freqs = np.einsum('irc,c->ri', self._Yf_blocks, g_optimal)
+        if self._pred_freqs_trace is not None:
+            self._pred_freqs_trace.append_rows(self._num_plans, pred_freqs[:, :self._Nac].T)
+            self._pred_freqs_trace.flush() # once per plan, the pool worker exits without flushing its files
+        self._num_plans += 1
+        u_opt = (self._Uf @ g_optimal).reshape(self._Nap, self._NUM_ATTACKED_LOADS).T
+        # Predicted frequencies are returned too, the pipelined handler predicts u_ini/y_ini of its next request from them
+        return {'attacks': u_opt[:, :self._Nac], 'pred_freqs': pred_freqs[:, :self._Nac]}
        
     
     def _log_osqp_solving_time(self, osqp_solving_start_time):
@@ -177,29 +281,123 @@ class OSQPSolver:
         self._avg_osqp_solving_time = (self._avg_osqp_solving_time * self._num_of_osqp_solved + osqp_solving_time) / (self._num_of_osqp_solved + 1)
         self._num_of_osqp_solved += 1
         log.info(f"OSQP solving time avg: {self._avg_osqp_solving_time:.0f} ms, last: {osqp_solving_time:.0f} ms")
+    
+    
+    def close(self):
+        if self._pred_freqs_trace is not None:
+            self._pred_freqs_trace.close()
         
 
-def osqp_process(main_to_osqp:Queue, osqp_to_main:Queue, pow_sys_consts):    
-    osqp_solver = OSQPSolver(pow_sys_consts)
-    
-    # Read the first data to initialize the solver
-    setup_data = main_to_osqp.get()
-    # Initialize the solver
-    osqp_solver.prepare_OSQP_parameters(setup_data['U'], setup_data['Y'])
-    osqp_solver.construct_constraints()
-    result = osqp_solver.setup_solve()
-    # Send the result of first calculation
-    osqp_to_main.put(result)
+def osqp_process(main_to_osqp:ShmChannel, osqp_to_main:ShmChannel, pow_sys_consts, qp_backend="osqp",
+                 setup_cache_dir=None, params=MDLAA_PARAMS, trace_dir=None):    
+    osqp_solver = OSQPSolver(pow_sys_consts, qp_backend, setup_cache_dir, params, trace_dir)
     
+    # U and Y for the setup, new samples in the online mode and the [u_ini; y_ini] solve requests
+    # all arrive flat, so one buffer of the slot size receives them all
+    buffer = np.empty(main_to_osqp.slot_size)
     while True:
-        data = main_to_osqp.get()
-        if type(data) == int and data == -1:
+        kind, payload = main_to_osqp.get(out=buffer)
+        if kind == MSG_STOP:
             log.info("Exiting OSQP process.")
+            osqp_solver.close()
             exit(0)
         
-        result = osqp_solver.update_solve(data['attack_history'], data['freq_history'])
-        try:
-            osqp_to_main.put(result)
-        except (EOFError, BrokenPipeError):
-            log.info("Exiting OSQP process.")
-            exit(0)
\ No newline at end of file
+        result = osqp_solver.handle_message(kind, payload)
+        if result is not None:
+            _put_result(osqp_to_main, result)
+
+
+def _put_result(osqp_to_main:ShmChannel, result):
+    if 'skip' in result:
+        osqp_to_main.put(MSG_SKIP)
+    else:
+        osqp_to_main.put(MSG_DATA, result['attacks'], result['pred_freqs'])
+
+
+# ---Solver in a process pool---
+_pool_solver = None
+
+def _init_pool_solver(pow_sys_consts, qp_backend, setup_cache_dir, params, trace_dir):
+    global _pool_solver
+    _pool_solver = OSQPSolver(pow_sys_consts, qp_backend, setup_cache_dir, params, trace_dir)
+
+def _pool_handle_message(kind, payload):
+    return _pool_solver.handle_message(kind, payload)
+
+
+class OSQPPoolChannel:
+    """
+        Both solver channels of the MDLAA handler in one object, served by an OSQPSolver living in
+        a single-worker ProcessPoolExecutor instead of a dedicated osqp_process.
+        The worker runs the messages in order, so the solver state persists between them.
+    """
+    def __init__(self, pow_sys_consts, qp_backend="osqp", setup_cache_dir=None, params=MDLAA_PARAMS, trace_dir=None):
+        self._executor = ProcessPoolExecutor(max_workers=1, initializer=_init_pool_solver,
+                                             initargs=(pow_sys_consts, qp_backend, setup_cache_dir, params, trace_dir))
+        self._pending = collections.deque() # (kind, future) of the messages sent so far
+
+    def put(self, kind: int, *arrays: np.ndarray, timeout=None):
+        if kind == MSG_STOP:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            return
+        payload = np.concatenate([np.ravel(array) for array in arrays]) if arrays else np.empty(0)
+        self._pending.append((kind, self._executor.submit(_pool_handle_message, kind, payload)))
+
+    def get(self, out: np.ndarray = None, timeout=None):
+        """Returns (kind, payload) of the oldest solve request, like ShmChannel.get"""
+        while self._pending:
+            kind, future = self._pending.popleft()
+            try:
+                result = future.result(timeout=timeout) # also raises the errors of the setup and data updates
+            except FutureTimeoutError:
+                self._pending.appendleft((kind, future))
+                raise queue.Empty
+            if kind != MSG_DATA:
+                continue
+            return _result_to_message(result, out)
+        raise queue.Empty
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class OSQPInlineChannel:
+    """
+        Both solver channels of the MDLAA handler in one object, with the OSQPSolver called right in put().
+        For the offline replay, where the handler blocks on every solve anyway. Keeps the solve times (ns).
+    """
+    def __init__(self, pow_sys_consts, qp_backend="osqp", setup_cache_dir=None, params=MDLAA_PARAMS, trace_dir=None):
+        self._solver = OSQPSolver(pow_sys_consts, qp_backend, setup_cache_dir, params, trace_dir)
+        self._results = collections.deque()
+        self.solve_times_ns = []
+
+    def put(self, kind: int, *arrays: np.ndarray, timeout=None):
+        if kind == MSG_STOP:
+            return
+        payload = np.concatenate([np.ravel(array) for array in arrays]) if arrays else np.empty(0)
+        solving_start_time = time.perf_counter_ns()
+        result = self._solver.handle_message(kind, payload)
+        if kind == MSG_DATA:
+            self.solve_times_ns.append(time.perf_counter_ns() - solving_start_time)
+            self._results.append(result)
+
+    def get(self, out: np.ndarray = None, timeout=None):
+        """Returns (kind, payload) of the oldest solve request, like ShmChannel.get"""
+        if not self._results:
+            raise queue.Empty
+        return _result_to_message(self._results.popleft(), out)
+
+    def close(self):
+        self._results.clear()
+        self._solver.close()
+
+
+def _result_to_message(result, out):
+    if 'skip' in result:
+        return MSG_SKIP, np.empty(0)
+    plan = np.concatenate([result['attacks'].ravel(), result['pred_freqs'].ravel()])
+    if out is None:
+        return MSG_DATA, plan
+    payload = out.reshape(-1)[:plan.shape[0]]
+    payload[:] = plan
+    return MSG_DATA, payload
@@ -0,0 +1,128 @@
+import numpy as np
+import osqp
+import scipy.linalg
+import scipy.sparse
+
+
+class OSQPBackend:
+    """
+        Solves min 1/2 g^T H g + f^T g  s.t.  l <= A g <= u  with OSQP.
+        H and A are dense, they are stored with a fully dense (upper triangular for H) sparsity pattern,
+        so that the online data refresh only updates their values.
+    """
+    name = "osqp"
+
+    def __init__(self):
+        self._osqp = osqp.OSQP()
+        self._triu_indices = None
+
+    def setup(self, H, f, A, l, u, num_eq, cached_state=None, **settings):
+        self._osqp.setup(P=self._dense_triu_csc(H), q=f, A=self._dense_csc(A), l=l, u=u, **settings)
+
+    def cache_state(self):
+        """Arrays restoring the backend in setup(cached_state=...). OSQP does not export its factorization."""
+        return {}
+
+    def update_problem(self, H, f, A):
+        rows, cols, _ = self._triu_indices
+        self._osqp.update(q=f, Px=H[rows, cols], Ax=A.ravel(order='F'))
+
+    def solve(self, l, u, warm_start_x=None):
+        """Returns (status, solution) with the OSQP status strings"""
+        self._osqp.update(l=l, u=u)
+        if warm_start_x is not None:
+            self._osqp.warm_start(x=warm_start_x)
+        result = self._osqp.solve()
+        return result.info.status, result.x
+
+    @staticmethod
+    def _dense_csc(M):
+        """CSC matrix storing every entry of the dense M, so its sparsity pattern never changes"""
+        rows_num, cols_num = M.shape
+        indptr = np.arange(0, rows_num * cols_num + 1, rows_num)
+        indices = np.tile(np.arange(rows_num), cols_num)
+        return scipy.sparse.csc_matrix((M.ravel(order='F'), indices, indptr), shape=M.shape)
+
+    def _dense_triu_csc(self, M):
+        """CSC matrix storing every entry of the upper triangular part of the dense, square M"""
+        if self._triu_indices is None: # the size of the problem never changes, computed once
+            cols, rows = np.tril_indices(M.shape[0]) # rows <= cols, ordered by column
+            indptr = np.concatenate([[0], np.cumsum(np.arange(1, M.shape[0] + 1))])
+            self._triu_indices = (rows, cols, indptr)
+        rows, cols, indptr = self._triu_indices
+        return scipy.sparse.csc_matrix((M[rows, cols], rows, indptr), shape=M.shape)
+
+
+class KKTBackend(OSQPBackend):
+    """
+        Solves the equality constrained problem (the first num_eq rows of A, with l == u) directly, from an LU
+        factorization of its KKT matrix [[H, A_eq^T], [A_eq, 0]] cached between the solves, as only the
+        right-hand side changes. Falls back to OSQP when the solution violates the bounds of the other rows,
+        i.e. when the bounds become active, or when the factorization is not accurate enough.
+        OSQP is set up on the first fallback only, so a setup from a cached factorization costs almost nothing.
+    """
+    name = "kkt"
+    EQ_RESIDUAL_TOL = 1e-6 # relative to the norm of the equality right-hand side
+
+    def __init__(self):
+        super().__init__()
+        self.num_kkt_solves = 0
+        self.num_fallbacks = 0
+
+    def setup(self, H, f, A, l, u, num_eq, cached_state=None, **settings):
+        self._problem = (H, f, A)
+        self._osqp_settings = settings
+        self._osqp_set_up = False
+        self._num_eq = num_eq
+        if cached_state is not None and 'kkt_lu' in cached_state:
+            self._split_constraints(f, A)
+            self._kkt_lu = (cached_state['kkt_lu'], cached_state['kkt_piv'])
+        else:
+            self._factorize(H, f, A)
+
+    def cache_state(self):
+        lu, piv = self._kkt_lu
+        return {'kkt_lu': lu, 'kkt_piv': piv}
+
+    def update_problem(self, H, f, A):
+        self._problem = (H, f, A)
+        if self._osqp_set_up:
+            super().update_problem(H, f, A)
+        self._factorize(H, f, A)
+
+    def solve(self, l, u, warm_start_x=None):
+        num_vars = self._rhs.shape[0] - self._num_eq
+        b_eq = l[:self._num_eq]
+        self._rhs[num_vars:] = b_eq
+        x = scipy.linalg.lu_solve(self._kkt_lu, self._rhs, check_finite=False)[:num_vars]
+
+        A_ineq_x = self._A_ineq @ x
+        eq_residual = np.linalg.norm(self._A_eq @ x - b_eq)
+        if np.isfinite(eq_residual) and eq_residual <= self.EQ_RESIDUAL_TOL * max(1.0, np.linalg.norm(b_eq)) \
+                and np.all(A_ineq_x >= l[self._num_eq:]) and np.all(A_ineq_x <= u[self._num_eq:]):
+            self.num_kkt_solves += 1
+            return "solved", x
+        self.num_fallbacks += 1
+        if not self._osqp_set_up:
+            super().setup(*self._problem, l, u, self._num_eq, **self._osqp_settings)
+            self._osqp_set_up = True
+        return super().solve(l, u, warm_start_x)
+
+    def _factorize(self, H, f, A):
+        self._split_constraints(f, A)
+        num_vars = H.shape[0]
+        kkt = np.zeros((num_vars + self._num_eq, num_vars + self._num_eq))
+        kkt[:num_vars, :num_vars] = H
+        kkt[:num_vars, num_vars:] = self._A_eq.T
+        kkt[num_vars:, :num_vars] = self._A_eq
+        self._kkt_lu = scipy.linalg.lu_factor(kkt, overwrite_a=True, check_finite=False)
+
+    def _split_constraints(self, f, A):
+        num_vars = A.shape[1]
+        self._A_eq = A[:self._num_eq]
+        self._A_ineq = A[self._num_eq:]
+        self._rhs = np.empty(num_vars + self._num_eq)
+        self._rhs[:num_vars] = -f
+
+
+QP_BACKENDS = {backend.name: backend for backend in (OSQPBackend, KKTBackend)}
@@ -0,0 +1,271 @@
+import argparse
+import re
+import sys
+import time
+
+import numpy as np
+
+from cosim.dnp3.lfc.mdlaa.constants import MILLI, MICRO, NOMINAL_FREQ, MDLAA_PARAMS, consts_39BUS, consts_KUNDUR
+from cosim.dnp3.lfc.mdlaa.MDLAA_ctrl import MDLAAHandler
+from cosim.trace import load_trace
+from cosim.dnp3.lfc.mdlaa.osqp_proc import OSQPInlineChannel, OSQPSolver
+from cosim.dnp3.lfc.mdlaa.qp_backends import QP_BACKENDS
+from cosim.dnp3.lfc.mdlaa.shm_channel import MSG_STOP
+from cosim.mylogging import configure_levels
+
+
+# Frequencies logged by MDLAAHandler._read_frequencies, in Hz, before the binary traces
+FREQS_LOG_PATTERN = re.compile(r" - INFO - Freqs: \[(.*)\]")
+# Modes replayed by --check, (online_data_refresh, pipelined)
+CHECK_MODES = {"default": (False, False), "online": (True, False), "pipelined": (False, True),
+               "online pipelined": (True, True)}
+
+
+def load_recorded_freqs(path):
+    """
+        Returns the recorded frequencies (Hz) as a [steps, gens] array, from an MDLAA_freqs.trace or a .npy file
+        (both memory-mapped), or from the "Freqs: [...]" lines of an older MDLAA log.
+    """
+    if path.endswith(".trace"):
+        _, records = load_trace(path)
+        return records['values']
+    if path.endswith(".npy"):
+        return np.load(path, mmap_mode='r')
+    with open(path, encoding="utf-8") as file:
+        frames = [re.findall(r"[-+\d.eE]+", match.group(1)) for match in map(FREQS_LOG_PATTERN.search, file) if match]
+    return np.array(frames, dtype=np.float64)
+
+
+class RecordedPlant:
+    """
+        Open loop: replays the recorded frequencies one frame per step, whatever the attacks.
+    """
+    def __init__(self, recorded_freqs):
+        self._freqs = np.asarray(recorded_freqs) / NOMINAL_FREQ # pu
+        self._step = 0
+        self.num_steps = self._freqs.shape[0]
+
+    def output(self):
+        return self._freqs[self._step]
+
+    def step(self, attack):
+        self._step += 1
+
+
+class LinearPlant:
+    """
+        Closed loop: discrete-time linear model of the frequency response to the load attacks, one step per step_time
+            x[k+1] = A x[k] + B (u[k] - 1)
+            y[k]   = y_base[k] + C x[k] + noise
+        with u the attacks (pu of load) and y the generator frequencies (pu). y_base is 1 by default, or the recorded
+        frequencies, cycled, so the recorded disturbances are replayed under the attacks. The measurement noise
+        keeps the Hankel matrices of a low order plant full rank, as on the real system.
+    """
+    def __init__(self, A, B, C, base_freqs=None, noise=1e-5, seed=0):
+        self._A = np.atleast_2d(A)
+        self._B = np.atleast_2d(B)
+        self._C = np.atleast_2d(C)
+        self._base = np.ones((1, self._C.shape[0])) if base_freqs is None else np.asarray(base_freqs) / NOMINAL_FREQ
+        self._noise = noise
+        self._rng = np.random.default_rng(seed)
+        self._x = np.zeros(self._A.shape[0])
+        self._y = np.empty(self._C.shape[0])
+        self._step = 0
+        self.num_steps = None
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        """Loads A, B and C from an .npz file"""
+        with np.load(path) as matrices:
+            return cls(matrices['A'], matrices['B'], matrices['C'], **kwargs)
+
+    @classmethod
+    def first_order(cls, num_gens, num_loads, pole=0.9, gain=0.3, seed=0, **kwargs):
+        """
+            One first order lag per generator, driven by a random mix of the load attacks. A load drop of
+            x pu on all the loads raises the steady state frequencies by about gain * x pu.
+        """
+        rng = np.random.default_rng(seed)
+        poles = rng.uniform(pole - 0.05, min(pole + 0.05, 0.99), num_gens)
+        mix = rng.uniform(0.5, 1.5, (num_gens, num_loads))
+        B = -gain * (1 - poles)[:, None] * mix / mix.sum(axis=1, keepdims=True)
+        return cls(np.diag(poles), B, np.eye(num_gens), seed=seed, **kwargs)
+
+    def output(self):
+        np.matmul(self._C, self._x, out=self._y)
+        self._y += self._base[self._step % self._base.shape[0]]
+        if self._noise > 0:
+            self._y += self._rng.normal(0, self._noise, self._y.shape[0])
+        return self._y
+
+    def step(self, attack):
+        self._x = self._A @ self._x + self._B @ (attack - 1)
+        self._step += 1
+
+
+class _AttackSink:
+    """Attack channel of the MDLAA handler keeping only the last attack sent, applied to the plant on the next step"""
+    def __init__(self, num_loads):
+        self.attack = np.ones(num_loads)
+
+    def put(self, kind: int, *arrays: np.ndarray, timeout=None):
+        if kind != MSG_STOP:
+            self.attack[:] = arrays[0]
+
+
+def replay(plant, pow_sys_consts, max_steps=None, online_data_refresh=False, pipelined=False, qp_backend="osqp",
+           setup_cache_dir=None, seed=2137, params=MDLAA_PARAMS, trace_dir=None):
+    """
+        Runs the MDLAAHandler against the plant as fast as possible: one frame per step, with the solver called inline
+        and no sleeping on step_time. Stops when the attack succeeds, when the handler gives up, after max_steps
+        or at the end of a recorded plant. Returns the outcome of the run and the solve times.
+    """
+    np.random.seed(seed) # the random attacks of the first phase
+    solver_channel = OSQPInlineChannel(pow_sys_consts, qp_backend, setup_cache_dir, params, trace_dir)
+    attack_sink = _AttackSink(pow_sys_consts['NUM_ATTACKED_LOADS'])
+    handler = MDLAAHandler(main_to_master1=_AttackSink(pow_sys_consts['NUM_LOADS_MASTER1']),
+                           main_to_master2=attack_sink, main_to_osqp=solver_channel, osqp_to_main=solver_channel,
+                           pow_sys_consts=pow_sys_consts, online_data_refresh=online_data_refresh, pipelined=pipelined,
+                           params=params, trace_dir=trace_dir)
+    if max_steps is None:
+        # Long enough for the settling, the data collection and the whole attack phase
+        max_steps = plant.num_steps if plant.num_steps is not None \
+            else -pow_sys_consts['wait_iters'] + 3 * pow_sys_consts['Ta']
+
+    success_step = -1
+    max_attack = min_attack = 1.0
+    freqs = np.empty(pow_sys_consts['NUM_GENS'])
+    start_time = time.perf_counter()
+    step = 0
+    try:
+        for step in range(max_steps):
+            np.multiply(plant.output(), NOMINAL_FREQ / MILLI, out=freqs) # mHz, as in the outstation point table
+            if np.any(freqs * MILLI / NOMINAL_FREQ >= params['Omega_r_weight']):
+                success_step = step
+                break
+            handler.process_data(freqs)
+            plant.step(attack_sink.attack)
+            max_attack = max(max_attack, float(attack_sink.attack.max()))
+            min_attack = min(min_attack, float(attack_sink.attack.min()))
+    except SystemExit: # the handler exits after the max attack iterations
+        pass
+    finally:
+        handler.close()
+        solver_channel.close()
+
+    return {'success_step': success_step,
+            'num_steps': step + 1,
+            'max_attack': max_attack,
+            'min_attack': min_attack,
+            'solve_times_ms': np.array(solver_channel.solve_times_ns) * MICRO,
+            'wall_time': time.perf_counter() - start_time}
+
+
+def make_plant(plant, freqs_path, pow_sys_consts):
+    """Plant of the --plant and --freqs arguments"""
+    recorded_freqs = load_recorded_freqs(freqs_path) if freqs_path is not None else None
+    if plant == "none":
+        assert recorded_freqs is not None, "The open loop replay needs the recorded frequencies"
+        return RecordedPlant(recorded_freqs)
+    if plant == "first-order":
+        return LinearPlant.first_order(pow_sys_consts['NUM_GENS'], pow_sys_consts['NUM_ATTACKED_LOADS'],
+                                       base_freqs=recorded_freqs)
+    return LinearPlant.from_file(plant, base_freqs=recorded_freqs)
+
+
+def check_modes(plant, freqs_path, pow_sys_consts, qp_backend="osqp", max_steps=None):
+    """Replays every mode of CHECK_MODES on a fresh plant, returns {mode: success step, -1 when the attack failed}"""
+    success_steps = {}
+    for mode, (online_data_refresh, pipelined) in CHECK_MODES.items():
+        result = replay(make_plant(plant, freqs_path, pow_sys_consts), pow_sys_consts, max_steps=max_steps,
+                        online_data_refresh=online_data_refresh, pipelined=pipelined, qp_backend=qp_backend)
+        success_steps[mode] = result['success_step']
+    return success_steps
+
+
+def check_rank_detection(pow_sys_consts, seed=0, period=10):
+    """
+        Prepares the solver from random U and Y, which have to pass the Hankel rank check, and from periodic U and Y
+        (Y copied from the rows of U), whose Hankel columns repeat every period steps, which have to fail it.
+        Returns (random data passed, rank deficient data failed).
+    """
+    rng = np.random.default_rng(seed)
+    Ta, num_loads, num_gens = pow_sys_consts['Ta'], pow_sys_consts['NUM_ATTACKED_LOADS'], pow_sys_consts['NUM_GENS']
+    periodic_U = np.tile(rng.uniform(0.9, 1.1, (num_loads, period)), Ta // period + 1)[:, :Ta]
+    data = ((rng.uniform(0.9, 1.1, (num_loads, Ta)), rng.uniform(0.99, 1.01, (num_gens, Ta))),
+            (periodic_U, np.resize(periodic_U, (num_gens, Ta))))
+    results = []
+    for U, Y in data:
+        try:
+            OSQPSolver(pow_sys_consts).prepare_OSQP_parameters(U, Y)
+            results.append(True)
+        except AssertionError:
+            results.append(False)
+    return results[0], not results[1]
+
+
+def set_log_level(level):
+    configure_levels({"cosim.dnp3.lfc.mdlaa": level})
+
+
+def add_replay_arguments(parser):
+    """Arguments shared by the replay and the sweep runner"""
+    parser.add_argument("pow_sys", choices=["39bus", "kundur"], help="Power system to attack.")
+    parser.add_argument("-f", "--freqs", required=False,
+                        help="Recorded frequencies: logs/MDLAA_freqs.trace, an .npy file or a copy of an older "
+                             "logs/MDLAA.log (the log itself is started afresh when the MDLAA modules are imported, "
+                             "unless COSIM_LOG_FILE_MODE=a).")
+    parser.add_argument("-p", "--plant", required=False, default="first-order",
+                        help="'first-order' (default), 'none' for the open loop replay of --freqs, "
+                             "or an .npz file with the A, B and C matrices of a linear plant.")
+    parser.add_argument("-s", "--max-steps", required=False, type=int, help="Stop after this many steps.")
+    parser.add_argument("-b", "--qp-backend", required=False, default="osqp", choices=list(QP_BACKENDS),
+                        help="QP backend of the solver.")
+    parser.add_argument("--setup-cache", required=False, metavar="DIR",
+                        help="Cache the prepared solver matrices in DIR.")
+    parser.add_argument("--online", required=False, action="store_true",
+                        help="Roll the samples measured during the attack into the solver data.")
+    parser.add_argument("--pipelined", required=False, action="store_true",
+                        help="Request the next plan from the predicted histories.")
+    parser.add_argument("--log-level", required=False, default="WARNING",
+                        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="Level of the MDLAA and solver logs, per step logging dominates the replay time.")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Replays the MDLAA attack offline, without DNP3, "
+                                                 "against recorded frequencies and/or a linear plant model.")
+    add_replay_arguments(parser)
+    parser.add_argument("--trace-dir", required=False,
+                        help="Write the frequency, attack and predicted frequency traces into this directory.")
+    parser.add_argument("--check", required=False, action="store_true",
+                        help="Check that the solver rejects rank deficient data and replay the default, online, "
+                             "pipelined and online pipelined modes instead, exit with 1 unless all succeed.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    set_log_level(args.log_level)
+    pow_sys_consts = consts_39BUS if args.pow_sys == "39bus" else consts_KUNDUR
+    if args.check:
+        random_passed, deficient_failed = check_rank_detection(pow_sys_consts)
+        print(f"{'rank check':>16}: random data " + ("passed" if random_passed else "FAILED") +
+              ", rank deficient data " + ("rejected" if deficient_failed else "NOT REJECTED"))
+        success_steps = check_modes(args.plant, args.freqs, pow_sys_consts, args.qp_backend, args.max_steps)
+        for mode, success_step in success_steps.items():
+            print(f"{mode:>16}: " + (f"success step {success_step}" if success_step >= 0 else "FAILED"))
+        sys.exit(0 if random_passed and deficient_failed and
+                 all(success_step >= 0 for success_step in success_steps.values()) else 1)
+    plant = make_plant(args.plant, args.freqs, pow_sys_consts)
+
+    result = replay(plant, pow_sys_consts, max_steps=args.max_steps, online_data_refresh=args.online,
+                    pipelined=args.pipelined, qp_backend=args.qp_backend, setup_cache_dir=args.setup_cache,
+                    trace_dir=args.trace_dir)
+    solve_times = result['solve_times_ms']
+    print(f"Success step: {result['success_step']}, steps: {result['num_steps']}, "
+          f"attacks within [{result['min_attack']:.4f}, {result['max_attack']:.4f}] pu, "
+          f"wall time: {result['wall_time']:.1f} s")
+    if solve_times.shape[0] > 0:
+        p50, p95 = np.percentile(solve_times, [50, 95])
+        print(f"{solve_times.shape[0]} solves: p50 {p50:.3f} ms, p95 {p95:.3f} ms, max {solve_times.max():.3f} ms")
@@ -0,0 +1,59 @@
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+from cosim.mylogging import getLogger
+
+
+log = getLogger(__name__, "logs/osqp.log")
+CACHE_VERSION = 1 # bump when the cached arrays change meaning
+
+
+class SetupCache:
+    """
+        On-disk cache of the prepared solver matrices, one uncompressed .npz file per identification data set.
+
+        The key hashes U, Y and every parameter the matrices depend on, so a run replaying the same data
+        (e.g. a sweep over the attack bounds only) loads H, f and the QP backend state instead of rebuilding them.
+        The files are written to a temporary name and renamed, so concurrent runs never read a partial file.
+    """
+    def __init__(self, cache_dir):
+        self._cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(U, Y, params):
+        digest = hashlib.sha256()
+        digest.update(repr((CACHE_VERSION, params['Tini'], params['Nap'], params['Q_weight'], params['R_weight'],
+                            params['Omega_r_weight'], U.shape, Y.shape)).encode())
+        digest.update(np.ascontiguousarray(U, dtype=np.float64).tobytes())
+        digest.update(np.ascontiguousarray(Y, dtype=np.float64).tobytes())
+        return digest.hexdigest()
+
+    def load(self, key):
+        """Returns the dict of cached arrays, None on a miss"""
+        path = self._path(key)
+        if not os.path.exists(path):
+            log.info(f"Setup cache miss: {key[:12]}")
+            return None
+        with np.load(path) as cached:
+            arrays = {name: cached[name] for name in cached.files}
+        log.info(f"Setup cache hit: {key[:12]}, cached {sorted(arrays)}")
+        return arrays
+
+    def save(self, key, arrays):
+        """Writes the arrays under the key, replacing any previous entry"""
+        fd, tmp_path = tempfile.mkstemp(dir=self._cache_dir, suffix=".npz.tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                np.savez(file, **arrays)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        log.info(f"Setup cache saved: {key[:12]}, cached {sorted(arrays)}")
+
+    def _path(self, key):
+        return os.path.join(self._cache_dir, f"{key}.npz")
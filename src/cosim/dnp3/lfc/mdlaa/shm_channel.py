@@ -0,0 +1,122 @@
+import queue
+import threading
+import numpy as np
+
+from multiprocessing import Semaphore
+from multiprocessing.shared_memory import SharedMemory
+
+
+# Message kinds, stored in the first field of each slot
+MSG_STOP = -1   # no payload, receiver exits
+MSG_DATA = 0    # frequencies, attacks, histories or solver results
+MSG_SETUP = 1   # historical data U and Y used to set up the solver
+MSG_SKIP = 2    # no payload, solver found the problem infeasible
+MSG_NEW_DATA = 3 # (u, y) samples measured during the attack, rolled into the solver data in the online mode
+
+_SLOT_HEADER = 2 # kind, payload length
+
+
+class ShmChannel:
+    """
+        Single-producer single-consumer ring buffer of fixed-layout float64 slots in shared memory.
+
+        Each slot holds [kind, payload length, payload...]. Two semaphores count the free and the filled slots,
+        so a message costs one copy into the slot and one copy out of it, with no pickling and no manager process.
+        Each side keeps its own slot counter, as only the producer writes and only the consumer reads.
+    """
+    def __init__(self, slot_size: int, num_slots: int = 8):
+        self._slot_size = slot_size
+        self._num_slots = num_slots
+        self._shm = SharedMemory(create=True, size=num_slots * (_SLOT_HEADER + slot_size) * 8)
+        self._free_slots = Semaphore(num_slots)
+        self._filled_slots = Semaphore(0)
+        self._owner = True
+        self._attach()
+
+    def _attach(self):
+        self._slots = np.ndarray((self._num_slots, _SLOT_HEADER + self._slot_size), dtype=np.float64,
+                                 buffer=self._shm.buf)
+        self._write_slot = 0
+        self._read_slot = 0
+
+    def __getstate__(self):
+        return {'name': self._shm.name, 'slot_size': self._slot_size, 'num_slots': self._num_slots,
+                'free_slots': self._free_slots, 'filled_slots': self._filled_slots}
+
+    def __setstate__(self, state):
+        self._shm = SharedMemory(name=state['name'])
+        self._slot_size = state['slot_size']
+        self._num_slots = state['num_slots']
+        self._free_slots = state['free_slots']
+        self._filled_slots = state['filled_slots']
+        self._owner = False
+        self._attach()
+
+    @property
+    def slot_size(self):
+        return self._slot_size
+
+    def put(self, kind: int, *arrays: np.ndarray, timeout=None):
+        """Copies the arrays (flattened in C order, one after another) into the next free slot."""
+        if not self._free_slots.acquire(timeout=timeout):
+            raise queue.Full
+        slot = self._slots[self._write_slot]
+        length = 0
+        for array in arrays:
+            size = np.size(array)
+            if length + size > self._slot_size:
+                self._free_slots.release()
+                raise ValueError(f"Message of at least {length + size} values exceeds the slot size {self._slot_size}")
+            slot[_SLOT_HEADER + length:_SLOT_HEADER + length + size] = np.ravel(array)
+            length += size
+        slot[0] = kind
+        slot[1] = length
+        self._write_slot = (self._write_slot + 1) % self._num_slots
+        self._filled_slots.release()
+
+    def get(self, out: np.ndarray = None, timeout=None):
+        """
+            Returns (kind, payload) of the oldest filled slot. The payload is copied into `out` when given
+            (must be C-contiguous and large enough) and returned as a flat view of its first values,
+            into a new array otherwise, and the slot is freed right away.
+        """
+        assert out is None or out.flags.c_contiguous, "Output buffer must be C-contiguous"
+        if not self._filled_slots.acquire(timeout=timeout):
+            raise queue.Empty
+        slot = self._slots[self._read_slot]
+        kind = int(slot[0])
+        length = int(slot[1])
+        if out is None:
+            payload = slot[_SLOT_HEADER:_SLOT_HEADER + length].copy()
+        else:
+            payload = out.reshape(-1)[:length]
+            payload[:] = slot[_SLOT_HEADER:_SLOT_HEADER + length]
+        self._read_slot = (self._read_slot + 1) % self._num_slots
+        self._free_slots.release()
+        return kind, payload
+
+    def close(self):
+        self._slots = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+class LocalChannel(ShmChannel):
+    """
+        The same ring buffer in private memory, for producer and consumer threads of a single process.
+    """
+    def __init__(self, slot_size: int, num_slots: int = 8):
+        self._slot_size = slot_size
+        self._num_slots = num_slots
+        self._free_slots = threading.Semaphore(num_slots)
+        self._filled_slots = threading.Semaphore(0)
+        self._slots = np.empty((num_slots, _SLOT_HEADER + slot_size), dtype=np.float64)
+        self._write_slot = 0
+        self._read_slot = 0
+
+    def __getstate__(self):
+        raise TypeError("LocalChannel cannot be shared with other processes, use ShmChannel instead")
+
+    def close(self):
+        self._slots = None
@@ -0,0 +1,100 @@
+import argparse
+import itertools
+import os
+
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+
+from cosim.dnp3.lfc.mdlaa.constants import MDLAA_PARAMS, consts_39BUS, consts_KUNDUR
+from cosim.dnp3.lfc.mdlaa.replay import replay, make_plant, set_log_level, add_replay_arguments
+
+
+SOLVE_TIME_PERCENTILES = (50, 95, 99)
+
+
+def parse_grid(specs):
+    """
+        Parses the NAME=V1,V2,... specs into {NAME: [values]}, cast to the type of the MDLAA_PARAMS default.
+    """
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if name not in MDLAA_PARAMS:
+            raise ValueError(f"Unknown parameter {name}, use one of {list(MDLAA_PARAMS)}")
+        cast = int if isinstance(MDLAA_PARAMS[name], int) else float
+        grid[name] = [cast(value) for value in values.split(",")]
+    return grid
+
+
+def configs_from_grid(grid):
+    """One params dictionary per point of the grid, the parameters not in the grid keep their defaults"""
+    return [{**MDLAA_PARAMS, **dict(zip(grid, values))} for values in itertools.product(*grid.values())]
+
+
+def _init_worker(log_level):
+    set_log_level(log_level)
+
+
+def _run_config(params, plant, pow_sys_consts, replay_kwargs):
+    """One row of the results. A failing configuration (e.g. a rank deficient Hankel matrix) keeps its error."""
+    row = dict(params)
+    try:
+        result = replay(plant, pow_sys_consts, params=params, **replay_kwargs)
+    except Exception as e:
+        return {**row, 'error': f"{type(e).__name__}: {e}"}
+
+    solve_times = result.pop('solve_times_ms')
+    row.update(result)
+    row['num_solves'] = solve_times.shape[0]
+    percentiles = np.percentile(solve_times, SOLVE_TIME_PERCENTILES) if solve_times.shape[0] > 0 \
+        else [np.nan] * len(SOLVE_TIME_PERCENTILES)
+    for percentile, value in zip(SOLVE_TIME_PERCENTILES, percentiles):
+        row[f'solve_p{percentile}_ms'] = value
+    row['solve_max_ms'] = solve_times.max() if solve_times.shape[0] > 0 else np.nan
+    row['error'] = ""
+    return row
+
+
+def sweep(configs, plant, pow_sys_consts, num_workers=None, log_level="WARNING", **replay_kwargs):
+    """
+        Replays every configuration in a process pool, each worker with its own params dictionary and a copy
+        of the plant. Returns the results as columns, in the order of the configurations.
+    """
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker, initargs=(log_level,)) as executor:
+        rows = list(executor.map(_run_config, configs, itertools.repeat(plant), itertools.repeat(pow_sys_consts),
+                                 itertools.repeat(replay_kwargs)))
+
+    names = dict.fromkeys(name for row in rows for name in row) # ordered union of the row keys
+    # Failed rows miss the results, filled with NaN
+    return {name: np.array([row.get(name, np.nan) for row in rows]) for name in names}
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Replays the MDLAA attack offline for every point of a parameter "
+                                                 "grid, in parallel, and saves the results as columns of an .npz file.")
+    add_replay_arguments(parser)
+    parser.add_argument("-g", "--grid", required=True, action="append", metavar="NAME=V1,V2,...",
+                        help=f"Values of a parameter, repeat for more parameters. One of {list(MDLAA_PARAMS)}.")
+    parser.add_argument("-j", "--jobs", required=False, type=int, default=os.cpu_count(),
+                        help="Number of worker processes, all cores by default.")
+    parser.add_argument("-o", "--output", required=False, default="sweep_results.npz",
+                        help="Results file, one array per column.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    pow_sys_consts = consts_39BUS if args.pow_sys == "39bus" else consts_KUNDUR
+    plant = make_plant(args.plant, args.freqs, pow_sys_consts)
+    configs = configs_from_grid(parse_grid(args.grid))
+    print(f"Sweeping {len(configs)} configurations on {args.jobs} workers...")
+
+    results = sweep(configs, plant, pow_sys_consts, num_workers=args.jobs, log_level=args.log_level,
+                    max_steps=args.max_steps, online_data_refresh=args.online, pipelined=args.pipelined,
+                    qp_backend=args.qp_backend, setup_cache_dir=args.setup_cache)
+    np.savez(args.output, **results)
+
+    num_failed = int(np.count_nonzero(results['error'] != ""))
+    num_successful = int(np.count_nonzero(results.get('success_step', np.empty(0)) >= 0))
+    print(f"{num_successful} successful, {num_failed} failed out of {len(configs)}, results saved into {args.output}")
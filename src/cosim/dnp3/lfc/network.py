@@ -12,6 +12,8 @@ def main(args):
     loss = 0        # percentage
     bandwidth = 1.0 # in Mbps
     jitter = "0ms"
+    env = ""        # environment of the dnp3 scripts
+    lfc_options = ""
     
     if hasattr(args, 'delay'):
         delay = args.delay
@@ -21,6 +23,10 @@ def main(args):
         bandwidth = args.bandwidth
     if hasattr(args, 'jitter'):
         jitter = args.jitter
+    if getattr(args, 'latency_trace', None):
+        env = f"COSIM_LATENCY_TRACE={args.latency_trace} "
+    if getattr(args, 'unsolicited', False):
+        lfc_options = " --unsolicited"
 
     setLogLevel('info')
 
@@ -52,15 +58,15 @@ def main(args):
     net.addLink(master, s1, cls=TCLink)
     
     # Run dnp3 scripts
-    info(master_forwarder.cmd("python3 -m cosim.dnp3.lfc.LFC_forwarder &"))
-    info(master.cmd("python3 -m cosim.dnp3.lfc.LFC_master &"))
+    info(master_forwarder.cmd(env + "python3 -m cosim.dnp3.lfc.LFC_forwarder" + lfc_options + " &"))
+    info(master.cmd(env + "python3 -m cosim.dnp3.lfc.LFC_master" + lfc_options + " &"))
     
     if args.attack == "slaa":
-        info(attacker.cmd("python3 -m cosim.dnp3.lfc.SLAA_controller &"))
+        info(attacker.cmd(env + "python3 -m cosim.dnp3.lfc.SLAA_controller &"))
     elif args.attack == "dlaa":
-        info(attacker.cmd("python3 -m cosim.dnp3.lfc.DLAA_controller &"))
+        info(attacker.cmd(env + "python3 -m cosim.dnp3.lfc.DLAA_controller &"))
     elif args.attack == "mdlaa":
-        info(attacker.cmd("python3 -m cosim.dnp3.lfc.mdlaa.procs_MDLAA_ctrl 39bus &"))
+        info(attacker.cmd(env + "python3 -m cosim.dnp3.lfc.mdlaa.MDLAA_ctrl 39bus --executor procs &"))
     
     net.start()
     CLI(net)
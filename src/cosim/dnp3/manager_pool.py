@@ -0,0 +1,58 @@
+import os
+import threading
+
+from typing import Optional
+
+from pydnp3 import asiodnp3
+
+from cosim.mylogging import getLogger
+
+
+DNP3_THREADS_ENV = "COSIM_DNP3_THREADS" # threads of the shared manager, 1 by default
+
+_log = getLogger(__name__, "logs/dnp3_manager.log")
+
+
+class DNP3ManagerPool:
+    """
+        Process-wide DNP3Manager shared by the masters and outstations of the process, so one ASIO thread pool
+        serves all their channels instead of one pool per station.
+
+        The manager is created on first use, with the log handler of the first station (None logs nothing).
+        A forked child gets its own manager, the threads of the parent's one are not forked.
+    """
+    _instance: Optional["DNP3ManagerPool"] = None
+    _instance_lock = threading.Lock()
+    _num_threads = int(os.environ.get(DNP3_THREADS_ENV, 1))
+
+    def __init__(self, num_threads: int, log_handler=None):
+        self.num_threads = num_threads
+        self._log_handler = log_handler # referenced for as long as the manager runs
+        self.manager = asiodnp3.DNP3Manager(num_threads, log_handler)
+        self._pid = os.getpid()
+        _log.info(f"Shared DNP3 manager started with {num_threads} threads.")
+
+    @classmethod
+    def get(cls, log_handler=None) -> "DNP3ManagerPool":
+        with cls._instance_lock:
+            if cls._instance is None or cls._instance._pid != os.getpid():
+                cls._instance = DNP3ManagerPool(cls._num_threads, log_handler)
+            return cls._instance
+
+    @classmethod
+    def set_num_threads(cls, num_threads: int):
+        """Threads of the shared manager, takes effect only before its first use"""
+        with cls._instance_lock:
+            if cls._instance is not None and cls._instance._pid == os.getpid():
+                _log.warning(f"The shared DNP3 manager already runs {cls._instance.num_threads} threads, "
+                             f"{num_threads} ignored.")
+                return
+            cls._num_threads = num_threads
+
+
+def get_shared_manager(log_handler=None):
+    return DNP3ManagerPool.get(log_handler).manager
+
+
+def set_num_threads(num_threads: int):
+    DNP3ManagerPool.set_num_threads(num_threads)
@@ -1,14 +1,106 @@
 from multiprocessing import Queue
+from typing import Callable, Dict
 
-from pydnp3 import asiodnp3, opendnp3, openpal
-from dnp3_python.dnp3station.master import MyMaster
+from pydnp3 import asiodnp3, asiopal, opendnp3, openpal
+from dnp3_python.dnp3station.master import MyMaster, DbPointVal
+from dnp3_python.dnp3station.station_utils import parsing_gv_to_mastercmdtype, command_callback
+
+from cosim import latency
+from cosim.dnp3.manager_pool import get_shared_manager
+
+
+IndexedCommandTypes: dict = {
+    opendnp3.ControlRelayOutputBlock: opendnp3.IndexedControlRelayOutputBlock,
+    opendnp3.AnalogOutputInt16: opendnp3.IndexedAnalogOutputInt16,
+    opendnp3.AnalogOutputInt32: opendnp3.IndexedAnalogOutputInt32,
+    opendnp3.AnalogOutputFloat32: opendnp3.IndexedAnalogOutputFloat32,
+    opendnp3.AnalogOutputDouble64: opendnp3.IndexedAnalogOutputDouble64
+}
+
+UNSOLICITED_INTEGRITY_PERIOD = 30000 # ms
 
 
 class MasterStation(MyMaster):    
-    def configure_master(self, soe_handler, outstation_ip, port, concurrency_hint=1, scan_time=1000):
+    _manager_is_shared = False
+
+    def __init__(self,
+                 master_ip: str = "0.0.0.0",
+                 outstation_ip: str = "127.0.0.1",
+                 port: int = 20000,
+                 master_id: int = 2,
+                 outstation_id: int = 1,
+                 log_handler=asiodnp3.ConsoleLogger().Create(),
+                 listener=asiodnp3.PrintingChannelListener().Create(),
+                 master_application=asiodnp3.DefaultMasterApplication().Create(),
+                 channel_log_level=opendnp3.levels.NORMAL,
+                 master_log_level=7,
+                 num_polling_retry: int = 2,
+                 delay_polling_retry: float = 0.2,
+                 stale_if_longer_than: float = 2,
+                 stack_config=None,
+                 *args, **kwargs):
+        """
+        The configuration of MyMaster.__init__ without its DNP3Manager, channel and master,
+        configure_master builds them on the shared manager, so no station starts and drops a manager of its own
+        """
+        self.log_handler = log_handler
+        self.listener = listener
+        self.master_application = master_application
+        self.num_polling_retry = num_polling_retry
+        self.delay_polling_retry = delay_polling_retry
+        self.stale_if_longer_than = stale_if_longer_than
+
+        self.stack_config = stack_config
+        if not self.stack_config:
+            self.stack_config = asiodnp3.MasterStackConfig()
+            self.stack_config.master.responseTimeout = openpal.TimeDuration().Seconds(2)
+            self.stack_config.link.RemoteAddr = outstation_id
+            self.stack_config.link.LocalAddr = master_id
+        self.retry = asiopal.ChannelRetry().Default()
+        self.channel_log_level = channel_log_level
+        self.master_log_level = master_log_level
+
+        self.soe_handler = None
+        self.manager = None
+        self.channel = None
+        self.master = None
+        self.slow_scan = ""
+        self.fast_scan = None
+
+        self._comm_conifg = {
+            "master_ip": master_ip,
+            "outstation_ip": outstation_ip,
+            "port": port,
+            "master_id": master_id,
+            "outstation_id": outstation_id,
+        }
+
+
+    def configure_master(self, soe_handler, outstation_ip, port, concurrency_hint=None, scan_time=1000, manager=None,
+                         unsolicited=False, integrity_period=UNSOLICITED_INTEGRITY_PERIOD):
+        """
+        :param concurrency_hint: threads of a manager of the station's own, the process-wide shared manager
+                                 (manager_pool) by default
+        :param manager: DNP3Manager to add the channel to, shared by other stations
+        :param unsolicited: enable the unsolicited responses of the outstation (all event classes) on startup,
+                            then only poll all the classes every integrity_period ms instead of every scan_time ms
+        """
         self._clean_master()
+        # Both set on each call, the stack config is kept from one configure_master to the next
+        if unsolicited:
+            self.stack_config.master.disableUnsolOnStartup = False
+            self.stack_config.master.unsolClassMask = opendnp3.ClassField.AllEventClasses()
+        else:
+            self.stack_config.master.disableUnsolOnStartup = True
+            self.stack_config.master.unsolClassMask = opendnp3.ClassField() # no class, no enabling request
         self.soe_handler = soe_handler
-        self.manager = asiodnp3.DNP3Manager(concurrency_hint, self.log_handler)
+        if manager is not None:
+            self.manager = manager
+        elif concurrency_hint is not None:
+            self.manager = asiodnp3.DNP3Manager(concurrency_hint, self.log_handler)
+        else:
+            self.manager = get_shared_manager(self.log_handler)
+        self._manager_is_shared = manager is not None or concurrency_hint is None
         self.channel = self.manager.AddTCPClient(id="tcpclient",
                                                  levels=opendnp3.levels.NORMAL,
                                                  retry=self.retry,
@@ -21,19 +113,69 @@ class MasterStation(MyMaster):
                                              application=self.master_application,
                                              config=self.stack_config)
         self.fast_scan = self.master.AddClassScan(opendnp3.ClassField().AllClasses(),
-                                                  openpal.TimeDuration().Milliseconds(scan_time),
+                                                  openpal.TimeDuration().Milliseconds(integrity_period if unsolicited
+                                                                                      else scan_time),
                                                   opendnp3.TaskConfig().Default())
 
     
+    def send_direct_point_commands(self, group: int, variation: int, index_and_value: Dict[int, DbPointVal],
+                                   call_back: Callable[[opendnp3.ICommandTaskResult], None] = None,
+                                   config: opendnp3.TaskConfig = None) -> None:
+        """
+        Batched send_direct_point_command: all commands are packed into one CommandSet,
+        so they are sent to the outstation in a single direct operate request.
+
+        :param index_and_value: point index -> value to set, e.g. {0: 1.02, 1: 0.98}
+        """
+        if not index_and_value:
+            return
+        if call_back is None:
+            call_back = command_callback
+        if latency.is_enabled():
+            call_back = _confirmed_callback(call_back)
+        if config is None:
+            config = opendnp3.TaskConfig().Default()
+
+        indexed_commands = []
+        for index, val_to_set in index_and_value.items():
+            if group == 40:
+                val_to_set = float(val_to_set) # accept numpy scalars too
+            master_cmd = parsing_gv_to_mastercmdtype(group=group, variation=variation, val_to_set=val_to_set)
+            indexed_commands.append(IndexedCommandTypes[type(master_cmd)](master_cmd, index))
+        latency.stamp(latency.HOP_ISSUED)
+        self.master.DirectOperate(opendnp3.CommandSet(indexed_commands), call_back, config)
+
+
     def get_db_by_group_variation_with_queue(self, group: int, variation: int, output_queue: Queue):
         data = self.get_db_by_group_variation(group, variation)
         output_queue.put(data)
 
 
+    def shutdown(self):
+        self._shutdown_shared_channel()
+        super().shutdown()
+
+
+    def _shutdown_shared_channel(self):
+        # Dropping the references stops a channel only together with its manager, a shared one outlives them
+        if self._manager_is_shared:
+            self._manager_is_shared = False
+            self.channel.Shutdown()
+
+
     def _clean_master(self):
-        del self.soe_handler
-        del self.manager
-        del self.channel
-        del self.master
-        del self.fast_scan
-        self.slow_scan = ""
\ No newline at end of file
+        # Dropping the last references stops a manager of the station's own
+        self._shutdown_shared_channel()
+        self.soe_handler = None
+        self.manager = None
+        self.channel = None
+        self.master = None
+        self.fast_scan = None
+        self.slow_scan = ""
+
+
+def _confirmed_callback(call_back):
+    def stamp_and_call_back(result):
+        latency.stamp(latency.HOP_CONFIRMED)
+        call_back(result)
+    return stamp_and_call_back
@@ -9,7 +9,7 @@ from typing import Union, TypeVar
 from cosim.mylogging import getLogger
 
 
-_log = getLogger(__name__, "logs/master.py")
+_log = getLogger(__name__, "logs/master.log")
 
 # alias
 DbPointVal = Union[float, int, bool]
@@ -0,0 +1,67 @@
+import numpy as np
+
+from typing import Iterable, List, Tuple
+
+
+class PointTable:
+    """
+        Array-backed storage of the points of a single GroupVariation.
+
+        Every point index maps to one slot of three preallocated arrays: value (float64),
+        quality flags (uint8) and receive timestamp (int64, ns). Writes are O(1) per index
+        and readers get zero-copy, read-only NumPy views of the slots written so far.
+
+        Note: the arrays are reallocated when an index beyond the current capacity arrives,
+        so readers should not keep views across scans.
+    """
+
+    def __init__(self, size=10):
+        self._values = np.zeros(size, dtype=np.float64)
+        self._flags = np.zeros(size, dtype=np.uint8)
+        self._timestamps = np.zeros(size, dtype=np.int64)
+        self._num_points = 0  # highest index written so far + 1
+
+    def write(self, index: int, value, flags: int, timestamp_ns: int):
+        if index >= self._values.shape[0]:
+            self._grow(index + 1)
+        self._values[index] = value
+        self._flags[index] = flags
+        self._timestamps[index] = timestamp_ns
+        if index >= self._num_points:
+            self._num_points = index + 1
+
+    def write_many(self, index_and_value: Iterable[Tuple[int, float]], flags: List[int], timestamp_ns: int):
+        for (index, value), point_flags in zip(index_and_value, flags):
+            self.write(index, value, point_flags, timestamp_ns)
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._read_only_view(self._values)
+
+    @property
+    def flags(self) -> np.ndarray:
+        return self._read_only_view(self._flags)
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self._read_only_view(self._timestamps)
+
+    def __len__(self):
+        return self._num_points
+
+    def _read_only_view(self, array: np.ndarray) -> np.ndarray:
+        view = array[:self._num_points]
+        view.flags.writeable = False
+        return view
+
+    def _grow(self, min_size: int):
+        new_size = max(min_size, 2 * self._values.shape[0])
+        self._values = self._grown_copy(self._values, new_size)
+        self._flags = self._grown_copy(self._flags, new_size)
+        self._timestamps = self._grown_copy(self._timestamps, new_size)
+
+    @staticmethod
+    def _grown_copy(array: np.ndarray, new_size: int) -> np.ndarray:
+        grown = np.zeros(new_size, dtype=array.dtype)
+        grown[:array.shape[0]] = array
+        return grown
@@ -1,11 +1,14 @@
 import datetime
 import logging
+import time
 
 from typing import Callable, Dict, List, Optional, Tuple, Union
 
 from pydnp3 import opendnp3
 from dnp3_python.dnp3station.visitors import *
 
+from cosim import latency
+from cosim.dnp3.point_table import PointTable
 from cosim.mylogging import getLogger
 
 DbPointVal = Union[float, int, bool, None]
@@ -54,6 +57,41 @@ VisitorIndexedAnalogOutputStatusInts: list = [
     opendnp3.GroupVariation.Group42Var4
 ]
 
+# GroupVariations mapped into the consolidated db (mimic DbHandler.db)
+DbNamesByGroupVariation: dict = {
+    opendnp3.GroupVariation.Group30Var1: "Analog",
+    opendnp3.GroupVariation.Group40Var4: "AnalogOutputStatus",
+    opendnp3.GroupVariation.Group30Var6: "AnalogDouble",
+    opendnp3.GroupVariation.Group1Var2: "Binary",
+    opendnp3.GroupVariation.Group10Var2: "BinaryOutputStatus"
+}
+
+
+class FlagsVisitorMixin:
+    """Records the quality flags of every visited point next to visitor.index_and_value."""
+    def __init__(self):
+        super(FlagsVisitorMixin, self).__init__()
+        self.flags = []
+
+    def OnValue(self, indexed_instance):
+        super(FlagsVisitorMixin, self).OnValue(indexed_instance)
+        self.flags.append(indexed_instance.value.flags.value)
+
+
+# TimeAndInterval points carry no flags (nor a scalar value), so they are not mirrored into a PointTable
+FlagsVisitorClasses: dict = {
+    visitor_class: type(f"Flags{visitor_class.__name__}", (FlagsVisitorMixin, visitor_class), {})
+    for visitor_class in [VisitorIndexedAnalog,
+                          VisitorIndexedAnalogInt,
+                          VisitorIndexedBinary,
+                          VisitorIndexedCounter,
+                          VisitorIndexedFrozenCounter,
+                          VisitorIndexedAnalogOutputStatus,
+                          VisitorIndexedAnalogOutputStatusInt,
+                          VisitorIndexedBinaryOutputStatus,
+                          VisitorIndexedDoubleBitBinary]
+}
+
 
 class SOEHandlerAdjusted(opendnp3.ISOEHandler):
     """
@@ -62,15 +100,24 @@ class SOEHandlerAdjusted(opendnp3.ISOEHandler):
         This is an interface for SequenceOfEvents (SOE) callbacks from the Master stack to the application layer.
     """
 
-    def __init__(self, log_file_path="logs/soehandler.log", soehandler_log_level=logging.INFO, station_ref=None, *args, **kwargs):
+    def __init__(self, log_file_path="logs/soehandler.log", soehandler_log_level=logging.INFO, station_ref=None,
+                 fast_path=False, *args, **kwargs):
         super(SOEHandlerAdjusted, self).__init__()
 
         self.station_ref = station_ref
 
+        # fast path: reuse one visitor per GroupVariation instead of building a new one on every header.
+        # Note: visitor.index_and_value is then cleared and refilled on each call, so
+        # _process_incoming_data implementations must not keep a reference to it between calls.
+        self._fast_path = fast_path
+        self._visitors: Dict[opendnp3.GroupVariation, VisitorClass] = {}
+
         # auxiliary database
         self._gv_index_value_nested_dict: Dict[opendnp3.GroupVariation, Optional[Dict[int, DbPointVal]]] = {}
         self._gv_ts_ind_val_dict: Dict[opendnp3.GroupVariation, Tuple[datetime.datetime, Optional[Dict[int, DbPointVal]]]] = {}
         self._gv_last_poll_dict: Dict[opendnp3.GroupVariation, Optional[datetime.datetime]] = {}
+        # array-backed mirror of the auxiliary database, one PointTable per GroupVariation
+        self._point_tables: Dict[opendnp3.GroupVariation, PointTable] = {}
 
         # logging
         self.logger = getLogger(self.__class__.__name__, log_file_path, soehandler_log_level)
@@ -88,35 +135,63 @@ class SOEHandlerAdjusted(opendnp3.ISOEHandler):
         :param info: HeaderInfo
         :param values: A collection of values received from the Outstation (various data types are possible).
         """
+        latency.stamp(latency.HOP_PROCESS)
         # print("=========Process, info.gv, values", info.gv, values)
-        visitor_class: Union[Callable, VisitorClass] = VisitorClassTypes[type(values)]
-        visitor = visitor_class()  # init
-        
-        # hot-fix VisitorXXAnalog do not distinguish float and integer.
-        # Parsing to Int
-        if visitor_class == VisitorIndexedAnalog and info.gv in VisitorIndexedAnalogInts:
-            visitor = VisitorIndexedAnalogInt()
-        elif visitor_class == VisitorIndexedAnalogOutputStatus and info.gv in VisitorIndexedAnalogOutputStatusInts:
-            visitor = VisitorIndexedAnalogOutputStatusInt()
-        
+        info_gv: opendnp3.GroupVariation = info.gv
+        if self._fast_path:
+            visitor = self._get_cached_visitor(info_gv, values)
+        else:
+            visitor = self._create_visitor(info_gv, values)
+
         # Note: mystery method, magic side effect to update visitor.index_and_value
         values.Foreach(visitor)
-
-        # visitor.index_and_value: List[Tuple[int, DbPointVal]]
-        for index, value in visitor.index_and_value:
-            log_string = 'SOEHandler.Process {0}\theaderIndex={1}\tdata_type={2}\tindex={3}\tvalue={4}'
-            self.logger.debug(log_string.format(info.gv, info.headerIndex, type(values).__name__, index, value))
-        
-        info_gv: opendnp3.GroupVariation = info.gv    
         visitor_ind_val: List[Tuple[int, DbPointVal]] = visitor.index_and_value
 
-        self.logger.debug("======== SOEHandler.Process")
-        self.logger.debug(f"info_gv {info_gv}")
-        self.logger.debug(f"visitor_ind_val {visitor_ind_val}")
+        # Skip building the debug strings altogether when they would be discarded anyway
+        if self.logger.isEnabledFor(logging.DEBUG):
+            log_string = 'SOEHandler.Process {0}\theaderIndex={1}\tdata_type={2}\tindex={3}\tvalue={4}'
+            for index, value in visitor_ind_val:
+                self.logger.debug(log_string.format(info_gv, info.headerIndex, type(values).__name__, index, value))
+            self.logger.debug("======== SOEHandler.Process")
+            self.logger.debug(f"info_gv {info_gv}")
+            self.logger.debug(f"visitor_ind_val {visitor_ind_val}")
 
+        # Point tables are updated first so that _process_incoming_data can read whole vectors from them
+        if isinstance(visitor, FlagsVisitorMixin):
+            self._update_point_table(info_gv, visitor_ind_val, visitor.flags)
         self._process_incoming_data(info_gv, visitor_ind_val)
         self._post_process(info_gv=info_gv, visitor_ind_val=visitor_ind_val)
 
+    @staticmethod
+    def _create_visitor(info_gv: opendnp3.GroupVariation, values: ICollectionIndexedVal) -> VisitorClass:
+        visitor_class: Union[Callable, VisitorClass] = VisitorClassTypes[type(values)]
+
+        # hot-fix VisitorXXAnalog do not distinguish float and integer.
+        # Parsing to Int
+        if visitor_class == VisitorIndexedAnalog and info_gv in VisitorIndexedAnalogInts:
+            visitor_class = VisitorIndexedAnalogInt
+        elif visitor_class == VisitorIndexedAnalogOutputStatus and info_gv in VisitorIndexedAnalogOutputStatusInts:
+            visitor_class = VisitorIndexedAnalogOutputStatusInt
+        return FlagsVisitorClasses.get(visitor_class, visitor_class)()
+
+    def _get_cached_visitor(self, info_gv: opendnp3.GroupVariation, values: ICollectionIndexedVal) -> VisitorClass:
+        visitor = self._visitors.get(info_gv)
+        if visitor is None:
+            visitor = self._create_visitor(info_gv, values)
+            self._visitors[info_gv] = visitor
+        else:
+            visitor.index_and_value.clear()
+            if isinstance(visitor, FlagsVisitorMixin):
+                visitor.flags.clear()
+        return visitor
+
+    def _update_point_table(self, info_gv: opendnp3.GroupVariation, visitor_ind_val: List[Tuple[int, DbPointVal]],
+                            flags: List[int]):
+        point_table = self._point_tables.get(info_gv)
+        if point_table is None:
+            point_table = PointTable()
+            self._point_tables[info_gv] = point_table
+        point_table.write_many(visitor_ind_val, flags, time.time_ns())
 
     def _process_incoming_data(self, info_gv: opendnp3.GroupVariation, visitor_ind_val: List[Tuple[int, DbPointVal]]):
         pass            
@@ -129,18 +204,21 @@ class SOEHandlerAdjusted(opendnp3.ISOEHandler):
         info_gv: GroupVariation,
         visitor_ind_val: List[Tuple[int, DbPointVal]]
         """
-        # Use dict update method to mitigate delay due to asynchronous communication. (i.e., return None)
-        # Also, capture unsolicited updated values.
-        if not self._gv_index_value_nested_dict.get(info_gv):
-            self._gv_index_value_nested_dict[info_gv] = (dict(visitor_ind_val))
-        else:
-            self._gv_index_value_nested_dict[info_gv].update(dict(visitor_ind_val))
+        # Update the per-GroupVariation store in place to mitigate delay due to asynchronous communication.
+        # (i.e., return None) Also, capture unsolicited updated values.
+        gv_store = self._gv_index_value_nested_dict.get(info_gv)
+        if gv_store is None:
+            gv_store = {}
+            self._gv_index_value_nested_dict[info_gv] = gv_store
+        for index, value in visitor_ind_val:
+            gv_store[index] = value
+        self._consolidate_db(info_gv, gv_store)
 
         # Use another layer of storage to handle timestamp related logic
-        self._gv_ts_ind_val_dict[info_gv] = (datetime.datetime.now(),
-                                             self._gv_index_value_nested_dict.get(info_gv))
+        now = datetime.datetime.now()
+        self._gv_ts_ind_val_dict[info_gv] = (now, gv_store)
         # Use another layer of storage to handle timestamp related logic
-        self._gv_last_poll_dict[info_gv] = datetime.datetime.now()
+        self._gv_last_poll_dict[info_gv] = now
 
     def Start(self):
         self.logger.debug('In SOEHandler.Start====')
@@ -160,10 +238,17 @@ class SOEHandlerAdjusted(opendnp3.ISOEHandler):
     def gv_last_poll_dict(self) -> Dict[opendnp3.GroupVariation, Optional[datetime.datetime]]:
         return self._gv_last_poll_dict
 
+    @property
+    def point_tables(self) -> Dict[opendnp3.GroupVariation, PointTable]:
+        return self._point_tables
+
+    def point_table(self, info_gv: opendnp3.GroupVariation) -> Optional[PointTable]:
+        return self._point_tables.get(info_gv)
+
     @property
     def db(self) -> dict:
-        """micmic DbHandler.db"""
-        self._consolidate_db()
+        """micmic DbHandler.db
+        Note: kept consolidated by _post_process, so reading it does not rebuild anything"""
         return self._db
 
     @staticmethod
@@ -178,28 +263,11 @@ class SOEHandlerAdjusted(opendnp3.ISOEHandler):
 
         return db
 
-    def _consolidate_db(self):
-        """map group variance to db with 4 keys:
-        "Binary", "BinaryOutputStatus", "Analog", "AnalogOutputStatus"
+    def _consolidate_db(self, info_gv: opendnp3.GroupVariation, gv_store: Dict[int, DbPointVal]):
+        """map group variance to db with 5 keys:
+        "Binary", "BinaryOutputStatus", "Analog", "AnalogOutputStatus", "AnalogDouble"
+        Note: the stores are updated in place, so the db only has to be re-pointed when a store is replaced
         """
-        pass
-        # for Analog
-        _db = {"Analog": self._gv_index_value_nested_dict.get(opendnp3.GroupVariation.Group30Var1)}
-        if _db.get("Analog"):
-            self._db.update(_db)
-        # for AnalogOutputStatus
-        _db = {"AnalogOutputStatus": self._gv_index_value_nested_dict.get(opendnp3.GroupVariation.Group40Var4)}
-        if _db.get("AnalogOutputStatus"):
-            self._db.update(_db)
-        # for AnalogDouble
-        _db = {"AnalogDouble": self._gv_index_value_nested_dict.get(opendnp3.GroupVariation.Group30Var6)}
-        if _db.get("AnalogDouble"):
-            self._db.update(_db)
-        # for Binary
-        _db = {"Binary": self._gv_index_value_nested_dict.get(opendnp3.GroupVariation.Group1Var2)}
-        if _db.get("Binary"):
-            self._db.update(_db)
-        # for Binary
-        _db = {"BinaryOutputStatus": self._gv_index_value_nested_dict.get(opendnp3.GroupVariation.Group10Var2)}
-        if _db.get("BinaryOutputStatus"):
-            self._db.update(_db)
\ No newline at end of file
+        gv_name = DbNamesByGroupVariation.get(info_gv)
+        if gv_name and gv_store and self._db.get(gv_name) is not gv_store:
+            self._db[gv_name] = gv_store
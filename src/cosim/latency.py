@@ -0,0 +1,219 @@
+import argparse
+import atexit
+import math
+import os
+import signal
+import sys
+import threading
+import time
+
+import numpy as np
+
+from pathlib import Path
+
+from cosim.mylogging import getLogger
+
+
+LATENCY_TRACE_ENV = "COSIM_LATENCY_TRACE" # export directory, set to enable the tracing at import
+PERCENTILES = (50, 90, 99, 99.9)
+
+# Hops of the measurement-to-actuation path, stamped in this order within one process
+HOP_PROCESS = "process"     # SOEHandlerAdjusted.Process entry, a new measurement
+HOP_COMPUTED = "computed"   # the handler computed (or forwarded) its output
+HOP_ISSUED = "issued"       # MasterStation.send_direct_point_commands sent the commands
+HOP_OPERATED = "operated"   # OutstationCommandHandler operated the commands of a request
+HOP_CONFIRMED = "confirmed" # the outstation answered the issued commands
+
+_log = getLogger(__name__, "logs/latency.log")
+_tracer = None
+
+
+class HdrHistogram:
+    """
+        Histogram of integer values (ns) with a fixed relative precision, as HdrHistogram: the buckets are linear
+        within each power of two, 2 significant figures keep every value within 1% of its bucket.
+        Values above highest_ns are counted in the last bucket, the exact min, max and sum are kept aside.
+    """
+    def __init__(self, highest_ns=60 * 10**9, significant_figures=2):
+        self.highest_ns = highest_ns
+        self.significant_figures = significant_figures
+        self._sub_bucket_bits = math.ceil(math.log2(2 * 10**significant_figures))
+        self._half_count = 1 << (self._sub_bucket_bits - 1)
+        self.counts = np.zeros(self._index(highest_ns) + 1, dtype=np.int64)
+        self.min_ns = None
+        self.max_ns = 0
+        self.sum_ns = 0
+
+    def _index(self, value):
+        magnitude = max(value.bit_length() - self._sub_bucket_bits, 0)
+        return (magnitude * self._half_count) + (value >> magnitude)
+
+    def _bucket_highest(self, index):
+        """Highest value counted in the bucket"""
+        magnitude = max(index // self._half_count - 1, 0)
+        return ((index - magnitude * self._half_count + 1) << magnitude) - 1
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+    def record(self, value_ns: int):
+        value_ns = max(int(value_ns), 0)
+        self.counts[min(self._index(value_ns), self.counts.shape[0] - 1)] += 1
+        self.min_ns = value_ns if self.min_ns is None else min(self.min_ns, value_ns)
+        self.max_ns = max(self.max_ns, value_ns)
+        self.sum_ns += value_ns
+
+    def merge(self, other: "HdrHistogram"):
+        assert (other.highest_ns, other.significant_figures) == (self.highest_ns, self.significant_figures), \
+            "Only histograms of the same range and precision can be merged"
+        self.counts += other.counts
+        if other.min_ns is not None:
+            self.min_ns = other.min_ns if self.min_ns is None else min(self.min_ns, other.min_ns)
+        self.max_ns = max(self.max_ns, other.max_ns)
+        self.sum_ns += other.sum_ns
+
+    def percentile(self, percentile: float) -> int:
+        """Highest value of the bucket reaching the percentile (capped by the max), 0 when empty"""
+        cumulative = np.cumsum(self.counts)
+        if cumulative[-1] == 0:
+            return 0
+        index = int(np.searchsorted(cumulative, math.ceil(percentile / 100 * cumulative[-1])))
+        return min(self._bucket_highest(index), self.max_ns)
+
+    def summary(self) -> str:
+        count = self.count
+        if count == 0:
+            return "no samples"
+        percentiles = ", ".join(f"p{p:g} {self.percentile(p) / 1e6:.3f}" for p in PERCENTILES)
+        return f"{count} samples, ms: min {self.min_ns / 1e6:.3f}, mean {self.sum_ns / count / 1e6:.3f}, " \
+               f"{percentiles}, max {self.max_ns / 1e6:.3f}"
+
+
+class LatencyTracer:
+    """
+        Stamps the hops of the measurement-to-actuation path with the monotonic clock. Each hop records its
+        latency since the previous hop ("issued->confirmed") and since the latest measurement ("process->issued")
+        into a histogram. The DNP3 callbacks run on the threads of the managers, hence the lock.
+    """
+    def __init__(self, export_dir="logs", highest_ns=60 * 10**9, significant_figures=2):
+        self.export_dir = export_dir
+        self._highest_ns = highest_ns
+        self._significant_figures = significant_figures
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._cycle_start_ns = None
+        self._last_hop = None
+        self._last_ns = None
+
+    def stamp(self, hop: str):
+        now = time.monotonic_ns()
+        with self._lock:
+            if hop == HOP_PROCESS:
+                self._cycle_start_ns = now
+            elif self._cycle_start_ns is None:
+                return # nothing measured yet
+            else:
+                self._record(f"{HOP_PROCESS}->{hop}", now - self._cycle_start_ns)
+                if self._last_hop != HOP_PROCESS:
+                    self._record(f"{self._last_hop}->{hop}", now - self._last_ns)
+            self._last_hop, self._last_ns = hop, now
+
+    def _record(self, name, value_ns):
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            histogram = HdrHistogram(self._highest_ns, self._significant_figures)
+            self._histograms[name] = histogram
+        histogram.record(value_ns)
+
+    def export(self, path=None) -> str:
+        """
+            Saves the histograms into an .npz file (latency_<script>_<pid>.npz in the export directory by default),
+            loadable with load_histograms, and logs their summaries. Can be called at any time.
+        """
+        if path is None:
+            path = Path(self.export_dir) / f"latency_{Path(sys.argv[0]).stem}_{os.getpid()}.npz"
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            names = list(self._histograms)
+            histograms = [self._histograms[name] for name in names]
+            np.savez(path, names=np.array(names, dtype=str),
+                     counts=np.array([histogram.counts for histogram in histograms]).reshape(len(names), -1),
+                     min_ns=np.array([histogram.min_ns or 0 for histogram in histograms], dtype=np.int64),
+                     max_ns=np.array([histogram.max_ns for histogram in histograms], dtype=np.int64),
+                     sum_ns=np.array([histogram.sum_ns for histogram in histograms], dtype=np.int64),
+                     highest_ns=self._highest_ns, significant_figures=self._significant_figures)
+            for name, histogram in zip(names, histograms):
+                _log.info(f"{name}: {histogram.summary()}")
+        _log.info(f"Latency histograms exported into {path}")
+        return str(path)
+
+
+def load_histograms(path: str) -> dict:
+    """{name: HdrHistogram} of a file saved by LatencyTracer.export"""
+    data = np.load(path)
+    histograms = {}
+    for i, name in enumerate(data['names']):
+        histogram = HdrHistogram(int(data['highest_ns']), int(data['significant_figures']))
+        histogram.counts[:] = data['counts'][i]
+        histogram.min_ns = int(data['min_ns'][i]) if histogram.count > 0 else None
+        histogram.max_ns = int(data['max_ns'][i])
+        histogram.sum_ns = int(data['sum_ns'][i])
+        histograms[str(name)] = histogram
+    return histograms
+
+
+def stamp(hop: str):
+    """Stamps the hop when the tracing is enabled, a no-op otherwise"""
+    if _tracer is not None:
+        _tracer.stamp(hop)
+
+
+def is_enabled() -> bool:
+    return _tracer is not None
+
+
+def enable_latency_tracing(export_dir="logs", significant_figures=2) -> LatencyTracer:
+    """
+        Starts stamping the hops. The histograms are exported at exit and on demand: on SIGUSR1 (when enabled
+        from the main thread) or with export_latency(). Also enabled at import by COSIM_LATENCY_TRACE=<dir>.
+    """
+    global _tracer
+    if _tracer is not None:
+        return _tracer
+    _tracer = LatencyTracer(export_dir, significant_figures=significant_figures)
+    atexit.register(_tracer.export)
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGUSR1, lambda signum, frame: _tracer.export())
+    return _tracer
+
+
+def export_latency(path=None):
+    if _tracer is None:
+        _log.warning("Latency tracing is not enabled, nothing to export.")
+        return None
+    return _tracer.export(path)
+
+
+if os.environ.get(LATENCY_TRACE_ENV):
+    enable_latency_tracing(os.environ[LATENCY_TRACE_ENV])
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Merges the latency histograms exported by the traced processes "
+                                                 "and prints their percentiles.")
+    parser.add_argument("files", nargs="+", help="latency_*.npz files, e.g. of several runs with the same settings.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    merged = {}
+    for file in args.files:
+        for name, histogram in load_histograms(file).items():
+            if name in merged:
+                merged[name].merge(histogram)
+            else:
+                merged[name] = histogram
+    for name, histogram in sorted(merged.items()):
+        print(f"{name:>22}: {histogram.summary()}")
@@ -1,25 +1,309 @@
-import logging 
+import atexit
+import logging
+import logging.handlers
+import multiprocessing.util
+import os
+import queue
 import sys
+import threading
+import time
 
 from pathlib import Path
-    
-def getLogger(logger_name: str, path_to_file: str, level=logging.INFO,
-              formatter=logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")):
-    logger = logging.getLogger(logger_name)
-    logger.setLevel(level)
-    
-    # Ensure the parent directories exist
-    Path(path_to_file).parent.mkdir(parents=True, exist_ok=True)
-    
-    file_handler = logging.FileHandler(path_to_file, encoding="utf-8", mode="w+")
-    file_handler.setFormatter(formatter)
-    file_handler.setLevel(level)
-
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(formatter)
-    console_handler.setLevel(level)
-
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
-    return logger
\ No newline at end of file
+
+
+ASYNC_LOGGING_ENV = "COSIM_ASYNC_LOGGING" # set to a drop policy (or 1) to start with the asynchronous backend
+LOG_LEVELS_ENV = "COSIM_LOG_LEVELS" # e.g. "cosim.dnp3.lfc.mdlaa=WARNING,SOEHandlerAdjusted=ERROR"
+LOG_FILE_MODE_ENV = "COSIM_LOG_FILE_MODE" # "w" (default) starts every log afresh in each run, "a" appends
+_log = logging.getLogger(__name__) # no handlers, its warnings go to stderr
+
+DEFAULT_FORMATTER = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+
+# ---Registry---
+# Process-wide, guarded by _registry_lock. The handlers have no level of their own, the level of each logger
+# decides what reaches them, so one handler can serve loggers of different levels.
+_registry_lock = threading.RLock()
+_file_handlers = {} # resolved path -> file handler shared by all the loggers writing into the file
+_console_handlers = {} # formatter -> stdout handler shared by all the loggers with that formatter
+_logger_sinks = {} # name -> file and console handlers of the loggers configured by getLogger
+_levels = {} # logger name prefix -> level, set by configure_levels
+_async_logging = None
+
+
+def getLogger(logger_name: str, path_to_file: str, level=logging.INFO, formatter=DEFAULT_FORMATTER):
+    """
+        Returns the logger writing into the file and to stdout. Idempotent: calling it again with the same name
+        and path (e.g. from every SOE handler instance) returns the same logger without adding handlers.
+        Each file is opened once per process and shared by all the loggers writing into it.
+        A level set by configure_levels for the logger (or a prefix of its name) wins over the level argument.
+    """
+    with _registry_lock:
+        logger = logging.getLogger(logger_name)
+        logger.setLevel(_configured_level(logger_name, level))
+
+        sinks = _logger_sinks.setdefault(logger_name, [])
+        new_sinks = [sink for sink in (_file_handler(path_to_file, formatter), _console_handler(formatter))
+                     if sink not in sinks]
+        if not new_sinks:
+            return logger
+        sinks.extend(new_sinks)
+        if _async_logging is None:
+            for sink in new_sinks:
+                logger.addHandler(sink)
+        else:
+            _async_logging.attach(logger, new_sinks)
+    return logger
+
+
+def configure_levels(levels):
+    """
+        Sets the levels per subsystem, {logger name prefix: level} or "prefix=LEVEL,...": "cosim.dnp3" covers
+        all the loggers named cosim.dnp3.*, the longest matching prefix wins. Applies to the loggers already
+        configured by getLogger and to the later ones. Also read at import from COSIM_LOG_LEVELS.
+    """
+    if isinstance(levels, str):
+        levels = dict(item.split("=", 1) for item in levels.split(",") if item)
+    with _registry_lock:
+        _levels.update({prefix.strip(): _to_level(level) for prefix, level in levels.items()})
+        for name in _logger_sinks:
+            level = _configured_level(name, None)
+            if level is not None:
+                logging.getLogger(name).setLevel(level)
+
+
+def _to_level(level):
+    return logging.getLevelName(level.strip().upper()) if isinstance(level, str) else level
+
+
+def _configured_level(logger_name, default):
+    prefixes = [prefix for prefix in _levels if logger_name == prefix or logger_name.startswith(prefix + ".")]
+    return _levels[max(prefixes, key=len)] if prefixes else default
+
+
+def _file_handler(path_to_file, formatter):
+    path = Path(path_to_file).resolve()
+    file_handler = _file_handlers.get(path)
+    if file_handler is None:
+        # Ensure the parent directories exist
+        path.parent.mkdir(parents=True, exist_ok=True)
+        file_handler = _BatchFileHandler(path, encoding="utf-8", mode=os.environ.get(LOG_FILE_MODE_ENV, "w"))
+        file_handler.setFormatter(formatter)
+        _file_handlers[path] = file_handler
+    return file_handler
+
+
+def _console_handler(formatter):
+    console_handler = _console_handlers.get(formatter)
+    if console_handler is None:
+        console_handler = _BatchStreamHandler(sys.stdout)
+        console_handler.setFormatter(formatter)
+        _console_handlers[formatter] = console_handler
+    return console_handler
+
+
+# ---Asynchronous backend---
+class _BatchFlushMixin:
+    """Handler whose flushes after each record can be deferred, the listener then flushes once per batch"""
+    deferred_flush = False
+
+    def flush(self):
+        if not self.deferred_flush:
+            super().flush()
+
+    def flush_batch(self):
+        super().flush()
+
+
+class _BatchFileHandler(_BatchFlushMixin, logging.FileHandler):
+    pass
+
+
+class _BatchStreamHandler(_BatchFlushMixin, logging.StreamHandler):
+    pass
+
+
+class _BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+        QueueHandler of the bounded queue. When the queue is full, the new record is dropped ("drop_new"),
+        the oldest queued one makes room for it ("drop_oldest"), or the caller waits ("block").
+        The dropped records are counted.
+    """
+    def __init__(self, log_queue, policy):
+        super().__init__(log_queue)
+        self.policy = policy
+        self.num_dropped = 0
+
+    def prepare(self, record):
+        # Plain string messages (the f-strings) are queued as they are and formatted by the listener thread. Any other
+        # message object is formatted now, it could change before the listener gets to it.
+        if isinstance(record.msg, str) and not record.args and not record.exc_info:
+            return record
+        return super().prepare(record)
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+        if self.policy == "block":
+            self.queue.put(record)
+            return
+        if self.policy == "drop_oldest":
+            try:
+                self.queue.get_nowait()
+                self.queue.put_nowait(record)
+            except (queue.Empty, queue.Full): # raced with the listener or another producer
+                pass
+        self.num_dropped += 1
+
+
+class _BatchingQueueListener(logging.handlers.QueueListener):
+    """
+        Single writer thread. Routes each record to the handlers of its logger and flushes them all once
+        the queue is drained, after batch_size records or after flush_interval seconds, whichever comes first.
+    """
+    def __init__(self, log_queue, batch_size, flush_interval):
+        super().__init__(log_queue, respect_handler_level=True)
+        self.sinks = {}
+        self.lock = threading.Lock() # held while writing, so a fork never copies a half written buffer
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._num_pending = 0
+        self._last_flush = time.monotonic()
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel) # waits for room instead of failing on a full queue
+
+    def handle(self, record):
+        with self.lock:
+            for sink in self.sinks.get(record.name, ()):
+                if record.levelno >= sink.level:
+                    sink.handle(record)
+            self._num_pending += 1
+            if self._num_pending >= self._batch_size or self.queue.empty() or \
+                    time.monotonic() - self._last_flush >= self._flush_interval:
+                self.flush()
+
+    def flush(self):
+        for sink in {sink for sinks in self.sinks.values() for sink in sinks}: # the shared ones once
+            sink.flush_batch()
+        self._num_pending = 0
+        self._last_flush = time.monotonic()
+
+
+class AsyncLogging:
+    """
+        Queue based logging backend: the loggers of getLogger only put their records into one bounded queue,
+        so the logging threads never wait for the disk or the terminal. A single QueueListener thread writes
+        the records and flushes the handlers in batches.
+
+        Forked children (multiprocessing) start their own listener with an empty queue and stop it on exit.
+    """
+    POLICIES = ("drop_new", "drop_oldest", "block")
+
+    def __init__(self, max_queue_size=10000, policy="drop_new", batch_size=256, flush_interval=0.5):
+        assert policy in self.POLICIES, f"Unknown policy {policy}, use one of {self.POLICIES}"
+        self._max_queue_size = max_queue_size
+        self._queue_handler = _BoundedQueueHandler(queue.Queue(max_queue_size), policy)
+        self._listener = _BatchingQueueListener(self._queue_handler.queue, batch_size, flush_interval)
+        self._is_running = False
+
+    @property
+    def num_dropped(self):
+        return self._queue_handler.num_dropped
+
+    def attach(self, logger, sinks):
+        for sink in sinks:
+            sink.deferred_flush = True
+            logger.removeHandler(sink)
+        self._listener.sinks.setdefault(logger.name, []).extend(sinks)
+        if self._queue_handler not in logger.handlers:
+            logger.addHandler(self._queue_handler)
+
+    def detach_all(self):
+        for name, sinks in self._listener.sinks.items():
+            logger = logging.getLogger(name)
+            logger.removeHandler(self._queue_handler)
+            for sink in sinks:
+                sink.deferred_flush = False
+                logger.addHandler(sink)
+        self._listener.sinks = {}
+
+    def start(self):
+        self._listener.start()
+        self._is_running = True
+
+    def stop(self):
+        """Writes the queued records, flushes the handlers and stops the listener"""
+        if not self._is_running:
+            return
+        self._is_running = False
+        self._listener.stop()
+        with self._listener.lock:
+            self._listener.flush()
+        if self.num_dropped > 0:
+            _log.warning(f"{self.num_dropped} log records dropped, the logging queue was full")
+
+    def before_fork(self):
+        self._listener.lock.acquire()
+        self._listener.flush()
+
+    def after_fork_in_parent(self):
+        self._listener.lock.release()
+
+    def after_fork_in_child(self):
+        # The listener thread is not forked and the queued records belong to the parent
+        sinks = self._listener.sinks
+        self._queue_handler.queue = queue.Queue(self._max_queue_size)
+        self._queue_handler.num_dropped = 0
+        self._listener = _BatchingQueueListener(self._queue_handler.queue, self._listener._batch_size,
+                                                self._listener._flush_interval)
+        self._listener.sinks = sinks
+        self._is_running = False
+        if _async_logging is self:
+            self.start()
+
+
+def _register_exit_in_child(async_logging):
+    # Processes of multiprocessing leave through os._exit, without the atexit callbacks
+    multiprocessing.util.Finalize(async_logging, async_logging.stop, exitpriority=0)
+
+
+def enable_async_logging(max_queue_size=10000, policy="drop_new", batch_size=256, flush_interval=0.5):
+    """
+        Moves all the loggers of getLogger, and the ones created later, to the asynchronous backend.
+        Also enabled at import by the COSIM_ASYNC_LOGGING environment variable.
+    """
+    global _async_logging
+    if _async_logging is not None:
+        return _async_logging
+    _async_logging = AsyncLogging(max_queue_size, policy, batch_size, flush_interval)
+    with _registry_lock:
+        for name, sinks in _logger_sinks.items():
+            _async_logging.attach(logging.getLogger(name), sinks)
+    _async_logging.start()
+
+    atexit.register(_async_logging.stop)
+    os.register_at_fork(before=_async_logging.before_fork, after_in_parent=_async_logging.after_fork_in_parent,
+                        after_in_child=_async_logging.after_fork_in_child)
+    multiprocessing.util.register_after_fork(_async_logging, _register_exit_in_child)
+    return _async_logging
+
+
+def disable_async_logging():
+    """Writes out the queued records and gives the handlers back to their loggers"""
+    global _async_logging
+    if _async_logging is None:
+        return
+    _async_logging.stop()
+    with _registry_lock:
+        _async_logging.detach_all()
+    _async_logging = None
+
+
+if os.environ.get(ASYNC_LOGGING_ENV, "0") != "0":
+    _policy = os.environ[ASYNC_LOGGING_ENV]
+    enable_async_logging(policy=_policy if _policy in AsyncLogging.POLICIES else "drop_new")
+
+if os.environ.get(LOG_LEVELS_ENV):
+    configure_levels(os.environ[LOG_LEVELS_ENV])
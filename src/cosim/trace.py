@@ -0,0 +1,74 @@
+import struct
+import time
+
+import numpy as np
+
+from pathlib import Path
+
+
+# Header: magic, version, number of values per record, header size in bytes, then the comma separated
+# value names padded with zeros, so the records start 8 byte aligned
+TRACE_MAGIC = b"COSTRACE"
+TRACE_VERSION = 1
+_HEADER_STRUCT = struct.Struct("<8sIII")
+
+
+def record_dtype(num_values: int) -> np.dtype:
+    """One record: step index, monotonic timestamp (ns) and the float64 values"""
+    return np.dtype([('step', '<i8'), ('time_ns', '<i8'), ('values', '<f8', (num_values,))])
+
+
+class TraceWriter:
+    """
+        Appends fixed-width binary records to a trace file, with no string formatting,
+        so the file can be memory-mapped by load_trace without any parsing.
+        The records go through the buffered file, call flush() to make the latest ones visible to the readers.
+    """
+    def __init__(self, path: str, names):
+        self._num_values = len(names)
+        self._dtype = record_dtype(self._num_values)
+        self._records = np.zeros(1, dtype=self._dtype) # reused for every append
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        names_bytes = ",".join(names).encode("utf-8")
+        header_size = -(-(_HEADER_STRUCT.size + len(names_bytes)) // 8) * 8
+        self._file = open(path, "wb")
+        self._file.write(_HEADER_STRUCT.pack(TRACE_MAGIC, TRACE_VERSION, self._num_values, header_size))
+        self._file.write(names_bytes.ljust(header_size - _HEADER_STRUCT.size, b"\0"))
+
+    def append(self, step: int, values: np.ndarray):
+        self.append_rows(step, np.reshape(values, (1, self._num_values)))
+
+    def append_rows(self, step: int, rows: np.ndarray):
+        """Appends one record per row of the [k, num_values] rows, all with the same step and timestamp"""
+        if self._records.shape[0] < rows.shape[0]:
+            self._records = np.zeros(rows.shape[0], dtype=self._dtype)
+        records = self._records[:rows.shape[0]]
+        records['step'] = step
+        records['time_ns'] = time.monotonic_ns()
+        records['values'] = rows
+        self._file.write(records.data)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def load_trace(path: str):
+    """
+        Returns (names, records) of a trace file, the records memory-mapped read-only as a structured array
+        with the 'step', 'time_ns' and 'values' fields. A partially written last record is left out.
+    """
+    with open(path, "rb") as file:
+        magic, version, num_values, header_size = _HEADER_STRUCT.unpack(file.read(_HEADER_STRUCT.size))
+        if magic != TRACE_MAGIC or version != TRACE_VERSION:
+            raise ValueError(f"{path} is not a version {TRACE_VERSION} trace file")
+        names = file.read(header_size - _HEADER_STRUCT.size).rstrip(b"\0").decode("utf-8").split(",")
+
+    dtype = record_dtype(num_values)
+    num_records = (Path(path).stat().st_size - header_size) // dtype.itemsize
+    if num_records == 0:
+        return names, np.zeros(0, dtype=dtype)
+    return names, np.memmap(path, dtype=dtype, mode="r", offset=header_size, shape=(num_records,))
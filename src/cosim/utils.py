@@ -34,6 +34,12 @@ def parse_arguments():
     parser.add_argument("-j", "--jitter", required=False,
                         default="0ms", type=check_correct_time_format,
                         help="Default 0ms. Jitter imposed on the network connections in seconds or milliseconds. E.g. 0ms, 1s, 500ms")
+    parser.add_argument("--unsolicited", required=False, action="store_true",
+                        help="LFC: the forwarder pushes the measurements to LFC_master as unsolicited responses "
+                             "instead of being polled every second.")
+    parser.add_argument("--latency-trace", required=False, metavar="DIR",
+                        help="Trace the latency of the LFC control loop and export the histograms into DIR. "
+                             "Merge them with python -m cosim.latency DIR/latency_*.npz")
     
     return parser.parse_args()
     
@@ -0,0 +1,100 @@
+import heapq
+import itertools
+import threading
+import time
+
+from typing import Callable, List, Optional
+
+from cosim.mylogging import getLogger
+
+
+_log = getLogger(__name__, "logs/watchdog.log")
+
+
+class WatchdogEntry:
+    """
+        Deadline of a single client of the Watchdog.
+        feed() is a single timestamp store, so it can be called from the hot path without any locking.
+    """
+    __slots__ = ("name", "timeout", "on_expired", "last_feed", "cancelled")
+
+    def __init__(self, name: str, timeout: float, on_expired: Callable[[], None]):
+        self.name = name
+        self.timeout = timeout
+        self.on_expired = on_expired
+        self.last_feed = time.monotonic()
+        self.cancelled = False
+
+    def feed(self):
+        self.last_feed = time.monotonic()
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Watchdog:
+    """
+        Process-wide watchdog keeping the deadlines of all registered entries in one heap served by one thread.
+
+        An entry expires when it has not been fed for `timeout` seconds (monotonic clock). Its callback is then
+        called from the watchdog thread, and again every `timeout` seconds for as long as the silence lasts.
+    """
+    _instance: Optional["Watchdog"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="watchdog", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def get(cls) -> "Watchdog":
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = Watchdog()
+            return cls._instance
+
+    def register(self, name: str, timeout: float, on_expired: Callable[[], None]) -> WatchdogEntry:
+        entry = WatchdogEntry(name, timeout, on_expired)
+        with self._cond:
+            heapq.heappush(self._heap, (entry.last_feed + timeout, next(self._seq), entry))
+            self._cond.notify()
+        return entry
+
+    def _run(self):
+        while True:
+            for entry in self._wait_for_expired_entries():
+                _log.debug(f"Watchdog entry {entry.name} expired after {entry.timeout} sec.")
+                try:
+                    entry.on_expired()
+                except Exception:
+                    _log.exception(f"Watchdog callback of {entry.name} failed.")
+
+    def _wait_for_expired_entries(self) -> List[WatchdogEntry]:
+        with self._cond:
+            while True:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                now = time.monotonic()
+                deadline = self._heap[0][0]
+                if deadline > now:
+                    self._cond.wait(deadline - now)
+                    continue
+
+                expired = []
+                while self._heap and self._heap[0][0] <= now:
+                    _, _, entry = heapq.heappop(self._heap)
+                    if entry.cancelled:
+                        continue
+                    feed_deadline = entry.last_feed + entry.timeout
+                    if feed_deadline > now:
+                        # Fed in the meantime, only the deadline moves
+                        heapq.heappush(self._heap, (feed_deadline, next(self._seq), entry))
+                    else:
+                        expired.append(entry)
+                        heapq.heappush(self._heap, (now + entry.timeout, next(self._seq), entry))
+                if expired:
+                    return expired